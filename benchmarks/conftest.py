@@ -0,0 +1,84 @@
+'''
+Shared fixtures for the benchmark suite.
+
+Run with ``pytest benchmarks``; see the README for saving and comparing
+baselines.  ``YAMICONFIG_BENCH_MAX_KEYS`` caps the largest generated config.
+'''
+import os
+import pytest
+
+SCALES = [10, 1000, 100000]
+MAX_KEYS = int(os.environ.get('YAMICONFIG_BENCH_MAX_KEYS', max(SCALES)))
+SHAPES = ['flat', 'nested']
+
+
+def pytest_generate_tests(metafunc):
+    if 'keys' in metafunc.fixturenames:
+        metafunc.parametrize('keys', [n for n in SCALES if n <= MAX_KEYS])
+    if 'shape' in metafunc.fixturenames:
+        metafunc.parametrize('shape', SHAPES)
+
+
+def make_data(keys, shape):
+    '''
+    Return a config with ``keys`` leaf settings.
+
+    ``flat`` configs have every setting at the top level; ``nested`` configs
+    have ten settings per section, with sections nested four levels deep.
+    '''
+    if shape == 'flat':
+        return dict(('key%d' % i, i) for i in range(keys))
+
+    data = {}
+    for i in range(keys):
+        node = data
+        for level in range(3):
+            node = node.setdefault('level%d_%d' % (level, (i // 10 ** (level + 1)) % 10), {})
+        node['key%d' % i] = i
+    return data
+
+
+def make_schema(data):
+    '''Return a schema dict matching ``make_data`` output'''
+    if isinstance(data, dict):
+        return dict((key, make_schema(value)) for (key, value) in data.items())
+    return type(data)
+
+
+def to_yaml(data, indent=0):
+    '''Render ``make_data`` output; much faster than a YAML dumper'''
+    lines = []
+    for key, value in data.items():
+        if isinstance(value, dict):
+            lines.append('%s%s:' % (' ' * indent, key))
+            lines.append(to_yaml(value, indent + 4))
+        else:
+            lines.append('%s%s: %r' % (' ' * indent, key, value))
+    return '\n'.join(lines)
+
+
+def rounds(keys):
+    '''Fewer rounds for the big configs, so the suite finishes'''
+    return 3 if keys >= 100000 else (10 if keys >= 1000 else 100)
+
+
+@pytest.fixture
+def data(keys, shape):
+    return make_data(keys, shape)
+
+
+@pytest.fixture
+def config_file(tmpdir, data):
+    path = tmpdir.join('default.yaml')
+    path.write(to_yaml(data) + '\n')
+    return str(path)
+
+
+@pytest.fixture
+def user_file(tmpdir, data):
+    '''A user file that overrides every tenth top-level key'''
+    path = tmpdir.join('user.yaml')
+    path.write(to_yaml(dict(
+        (key, value) for (i, (key, value)) in enumerate(data.items())
+        if i % 10 == 0)) + '\n')
+    return str(path)
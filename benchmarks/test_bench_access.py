@@ -0,0 +1,73 @@
+'''Benchmarks for reading settings'''
+import pytest
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # Python 2
+    from collections import Mapping
+
+from yamiconfig import Configuration
+from yamiconfig.shared import SharedConfig
+
+from conftest import make_schema, rounds
+
+pytest.importorskip('pytest_benchmark')
+
+
+def _read_all(c, keys):
+    for key in keys:
+        c[key]
+
+
+@pytest.mark.parametrize('use_os_keys', [False, True], ids=['plain', 'os_keys'])
+def test_getitem(benchmark, config_file, keys, use_os_keys):
+    c = Configuration(
+        default_config_file=config_file, use_os_keys=use_os_keys, loader='fast')
+    benchmark.pedantic(_read_all, args=(c, list(c)), rounds=rounds(keys))
+
+
+def test_get_path(benchmark, config_file, keys):
+    c = Configuration(default_config_file=config_file, loader='fast')
+    paths = []
+    for key in c:
+        index = c._index_paths(key)
+        paths.extend(path for path in index if not isinstance(index[path], dict))
+    benchmark.pedantic(c.get_many, args=(paths,), rounds=rounds(keys))
+
+
+def _write_all(c, paths):
+    set_path = c.set_path
+    for path, value in paths:
+        set_path(path, value)
+
+
+@pytest.mark.parametrize('validate_writes', [False, True], ids=['plain', 'validated'])
+def test_set_path(benchmark, config_file, data, keys, validate_writes):
+    c = Configuration(
+        default_config_file=config_file, valid_schema=make_schema(data),
+        loader='fast', validate_writes=validate_writes)
+    paths = []
+    for key in c:
+        index = c._index_paths(key)
+        paths.extend(
+            (path, value) for (path, value) in index.items()
+            if not isinstance(value, Mapping))
+    benchmark.pedantic(_write_all, args=(c, paths[:1000]), rounds=rounds(keys))
+
+
+def _get_all(shared, paths):
+    get_path = shared.get_path
+    for path in paths:
+        get_path(path)
+
+
+def test_shared_get_path(benchmark, config_file, keys, tmpdir):
+    c = Configuration(default_config_file=config_file, loader='fast')
+    path = str(tmpdir.join('config.shared'))
+    c.share(path)
+    shared = SharedConfig(path)
+    paths = []
+    for key in c:
+        index = c._index_paths(key)
+        paths.extend(path for path in index if not isinstance(index[path], Mapping))
+    benchmark.pedantic(_get_all, args=(shared, paths), rounds=rounds(keys))
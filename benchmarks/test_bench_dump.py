@@ -0,0 +1,26 @@
+'''Benchmarks for writing configurations back out'''
+import pytest
+from yamiconfig import Configuration
+
+from conftest import rounds
+
+pytest.importorskip('pytest_benchmark')
+
+
+def test_dump(benchmark, config_file, keys):
+    c = Configuration(default_config_file=config_file)
+    benchmark.pedantic(c.dump, rounds=rounds(keys))
+
+
+def test_store_defaults(benchmark, config_file, tmpdir, keys):
+    c = Configuration(default_config_file=config_file)
+    path = str(tmpdir.join('user.yaml'))
+    benchmark.pedantic(c.store_defaults, args=(path,), rounds=rounds(keys))
+
+
+def test_store_config(benchmark, config_file, tmpdir, data, keys):
+    c = Configuration(default_config_file=config_file)
+    key = next(iter(data))
+    c[key] = c[key] + 1 if isinstance(c[key], int) else {}
+    path = str(tmpdir.join('user.yaml'))
+    benchmark.pedantic(c.store_config, args=(path,), rounds=rounds(keys))
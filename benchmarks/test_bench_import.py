@@ -0,0 +1,42 @@
+'''Benchmarks for ``import yamiconfig``, measured with ``python -X importtime``'''
+import os
+import re
+import sys
+import subprocess
+
+import pytest
+import yamiconfig
+
+pytest.importorskip('pytest_benchmark')
+
+_LINE_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$')
+
+# Modules that a plain import (or loading an artifact) shouldn't pull in
+HEAVY = ('ruamel', 'yamiconfig.schema', 'copy', 'tempfile', 'logging', 'pickle')
+
+
+def import_times(code='import yamiconfig'):
+    '''Return ``{module: cumulative microseconds}`` for a fresh interpreter'''
+    output = subprocess.check_output(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        stderr=subprocess.STDOUT, universal_newlines=True,
+        cwd=os.path.dirname(os.path.dirname(yamiconfig.__file__)))
+    times = {}
+    for line in output.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            times[match.group(4)] = int(match.group(2))
+    return times
+
+
+def _import_yamiconfig():
+    return import_times()['yamiconfig']
+
+
+def test_import(benchmark):
+    times = import_times()
+    heavy = sorted(m for m in times if m.split('.')[0] in HEAVY or m in HEAVY)
+    assert not heavy, heavy
+
+    benchmark.extra_info['cumulative_us'] = times['yamiconfig']
+    benchmark.pedantic(_import_yamiconfig, rounds=5)
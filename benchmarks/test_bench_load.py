@@ -0,0 +1,46 @@
+'''Benchmarks for loading configuration files'''
+import pytest
+from yamiconfig import Configuration
+from yamiconfig.schema import Schema
+
+from conftest import make_schema, rounds
+
+pytest.importorskip('pytest_benchmark')
+
+
+@pytest.mark.parametrize('loader', ['roundtrip', 'fast'])
+def test_init(benchmark, config_file, keys, loader):
+    benchmark.pedantic(
+        Configuration, kwargs=dict(default_config_file=config_file, loader=loader),
+        rounds=rounds(keys))
+
+
+def test_init_validated(benchmark, config_file, data, keys):
+    schema = Schema(make_schema(data))
+    benchmark.pedantic(
+        Configuration,
+        kwargs=dict(default_config_file=config_file, valid_schema=schema, loader='fast'),
+        rounds=rounds(keys))
+
+
+@pytest.mark.parametrize('loader', ['roundtrip', 'fast'])
+def test_load_configs(benchmark, config_file, user_file, keys, loader):
+    c = Configuration(
+        default_config_file=config_file, user_config_files=[user_file],
+        loader=loader)
+    benchmark.pedantic(c.load_configs, rounds=rounds(keys))
+
+
+@pytest.mark.parametrize('loader', ['roundtrip', 'fast'])
+def test_load_file(benchmark, config_file, user_file, keys, loader):
+    c = Configuration(default_config_file=config_file, loader=loader)
+    benchmark.pedantic(c.load_file, args=(user_file,), rounds=rounds(keys))
+
+
+def test_load_artifact(benchmark, tmpdir, config_file, data, keys):
+    schema = Schema(make_schema(data))
+    artifact = str(tmpdir.join('config.yamic'))
+    c = Configuration(
+        default_config_file=config_file, valid_schema=schema, loader='fast')
+    c.compile(artifact)
+    assert benchmark.pedantic(c.load_artifact, args=(artifact,), rounds=rounds(keys))
@@ -0,0 +1,65 @@
+'''Benchmarks for ``Schema.validate`` and compiled schemas'''
+import pytest
+from yamiconfig.schema import Schema, Or, Regex, Use, ValidationMemo
+
+from conftest import make_schema, rounds
+
+pytest.importorskip('pytest_benchmark')
+
+# Uncompiled dict validation is quadratic in the number of keys
+MAX_UNCOMPILED_KEYS = 1000
+
+
+def _validator(schema, compiled, keys):
+    if compiled:
+        return schema.compile().validate
+    if keys > MAX_UNCOMPILED_KEYS:
+        pytest.skip('too slow without compiling')
+    return schema.validate
+
+
+@pytest.mark.parametrize('compiled', [False, True], ids=['validate', 'compiled'])
+def test_validate_dict(benchmark, data, keys, compiled):
+    validate = _validator(Schema(make_schema(data)), compiled, keys)
+    benchmark.pedantic(validate, args=(data,), rounds=rounds(keys))
+
+
+@pytest.mark.parametrize('compiled', [False, True], ids=['validate', 'compiled'])
+def test_validate_or(benchmark, keys, compiled):
+    data = [(i if i % 3 else str(i)) for i in range(keys)]
+    validate = _validator(Schema([Or(float, str, int)]), compiled, 0)
+    benchmark.pedantic(validate, args=(data,), rounds=rounds(keys))
+
+
+@pytest.mark.parametrize('compiled', [False, True], ids=['validate', 'compiled'])
+def test_validate_or_dicts(benchmark, keys, compiled):
+    '''A list of service definitions, each matching one of 15 variants'''
+    variants = [{'type': 'kind%d' % i, 'name': str, 'port': int} for i in range(15)]
+    data = [{'type': 'kind%d' % (i % 15), 'name': 'svc%d' % i, 'port': i} for i in range(keys)]
+    validate = _validator(Schema([Or(*variants)]), compiled, 0)
+    benchmark.pedantic(validate, args=(data,), rounds=rounds(keys))
+
+
+@pytest.mark.parametrize('memo', [False, True], ids=['plain', 'memo'])
+def test_validate_repeated(benchmark, keys, memo):
+    '''Identical (but separate) per-shard blocks'''
+    schema = Schema({'shards': [{'name': str, 'port': int, 'tags': [str], 'db': {'size': int}}]})
+    data = {'shards': [
+        {'name': 'shard', 'port': 80, 'tags': ['a', 'b'], 'db': {'size': 2}}
+        for _ in range(max(1, keys // 5))]}
+    validate = schema.compile(memo=ValidationMemo() if memo else None).validate
+    benchmark.pedantic(validate, args=(data,), rounds=rounds(keys))
+
+
+@pytest.mark.parametrize('compiled', [False, True], ids=['validate', 'compiled'])
+def test_validate_regex(benchmark, keys, compiled):
+    data = ['value-%d' % i for i in range(keys)]
+    validate = _validator(Schema([Regex(r'^value-\d+$')]), compiled, 0)
+    benchmark.pedantic(validate, args=(data,), rounds=rounds(keys))
+
+
+@pytest.mark.parametrize('compiled', [False, True], ids=['validate', 'compiled'])
+def test_validate_use(benchmark, keys, compiled):
+    data = [str(i) for i in range(keys)]
+    validate = _validator(Schema([Use(int)]), compiled, 0)
+    benchmark.pedantic(validate, args=(data,), rounds=rounds(keys))
@@ -6,9 +6,15 @@
 from setuptools import setup, find_packages
 
 
-requirements = ['ruamel.yaml']
+requirements = [
+    'ruamel.yaml',
+    'futures; python_version < "3"',  # ``Configuration(max_workers=...)``
+]
 test_requirements = ['pytest']
 
+# The libyaml-based parser used by ``Configuration(loader='fast')``
+extra_requirements = {'fast': ['ruamel.yaml.clib']}
+
 setup(
     name='yamiconfig',
     version='0.2.0',
@@ -20,6 +26,10 @@ setup(
     packages=find_packages(include=['yamiconfig']),
     include_package_data=True,
     install_requires=requirements,
+    extras_require=extra_requirements,
+    entry_points={
+        'console_scripts': ['yamiconfig=yamiconfig.__main__:main'],
+    },
     license="MIT license",
     zip_safe=True,
     keywords='yamiconfig',
@@ -0,0 +1,9 @@
+'''
+Test collection settings.
+
+``test_aio.py`` uses ``async def`` (a syntax error on Python 2) and
+``asyncio.run`` (Python 3.7), so it's skipped on older versions.
+'''
+import sys
+
+collect_ignore = ['test_aio.py'] if sys.version_info < (3, 7) else []
@@ -0,0 +1,41 @@
+import asyncio
+import pytest
+from yamiconfig import Configuration
+
+
+@pytest.fixture(scope='session')
+def temp_dir(tmpdir_factory):
+    fn = tmpdir_factory.mktemp('aio')
+    return fn
+
+
+def test_aload(temp_dir):
+    default = temp_dir.join("config-default.yaml")
+    default.write('test1: 2\ntest3: {a: 4}\n')
+    users = []
+    for index in range(5):
+        user = temp_dir.join("config-user-%d.yaml" % index)
+        user.write('test3: {a: %d}\n' % index)
+        users.append(str(user))
+
+    async def main():
+        c = await Configuration.aload(str(default), user_config_files=users)
+        assert c['test3']['a'] == 4
+        assert c.max_workers
+
+        # Handlers keep seeing the old settings until the reload is done
+        snapshot = c.snapshot()
+        temp_dir.join("config-user-4.yaml").write('test3: {a: 40}\n')
+        reload = asyncio.ensure_future(c.areload())
+        assert c['test3']['a'] == 4
+        await reload
+        assert c['test3']['a'] == 40
+        assert snapshot['test3']['a'] == 4
+
+        # A failed reload keeps the current settings
+        temp_dir.join("config-user-2.yaml").write('test3: {a: [}\n')
+        with pytest.raises(Exception):
+            await c.areload()
+        assert c['test3']['a'] == 40
+
+    asyncio.run(main())
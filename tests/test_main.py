@@ -1,6 +1,17 @@
+import os
+import sys
+import gc
+import json
+import time
+import subprocess
 import pytest
-from yamiconfig import Configuration
-from yamiconfig.schema import Schema, SchemaError
+import yamiconfig
+import yamiconfig.__main__
+from yamiconfig import Configuration, ConfigCache, LoadStats, OS_KEY
+from yamiconfig.frozen import FrozenDict
+from yamiconfig.lazy import LazySections
+from yamiconfig.shared import SharedConfig
+from yamiconfig.schema import Schema, SchemaError, SchemaErrorList, And, Optional, Or
 
 
 @pytest.fixture(scope='session')
@@ -43,6 +54,656 @@ test3: 5
     assert c['test3'] == 5
 
 
+def test_user_nested(temp_dir):
+    '''Ensure nested sections are merged, not replaced'''
+    default = temp_dir.join("config-nested-default.yaml")
+    default.write('''
+db:
+    host: localhost  # The database host
+    pool:
+        size: 2
+        timeout: 10
+    ''')
+
+    user = temp_dir.join("config-nested-user.yaml")
+    user.write('''
+db:
+    pool:
+        size: 5
+    ''')
+
+    c = Configuration(
+        default_config_file=str(default),
+        user_config_files=[str(user)])
+
+    assert c['db']['host'] == 'localhost'
+    assert c['db']['pool']['size'] == 5
+    assert c['db']['pool']['timeout'] == 10
+
+    # Writes land in the overlay, not in the loaded data
+    c['db']['pool']['timeout'] = 20
+    assert c['db']['pool']['timeout'] == 20
+    assert c._default['db']['pool']['timeout'] == 10
+    assert not c.is_default('db')
+    assert '# The database host' in c.dump()
+
+    c.reset()
+    assert c['db']['pool'] == {'size': 2, 'timeout': 10}
+    assert c.is_default('db')
+
+
+def test_os_keys():
+    yaml_str = '''
+path: {windows: 'c:\\', linux: /, mac: /Volumes}
+tools:
+    editor:
+        windows: notepad
+        linux: vi
+        mac: vi
+    names: [{windows: a, linux: b, mac: b}]
+plain: {a: 1}
+'''
+    c = Configuration(default_yaml_text=yaml_str, use_os_keys=True)
+    expected = {'windows': 'notepad', 'linux': 'vi', 'mac': 'vi'}[OS_KEY]
+    assert c['path'] == {'windows': 'c:\\', 'linux': '/', 'mac': '/Volumes'}[OS_KEY]
+    assert c['tools']['editor'] == expected
+    assert c['tools']['names'][0] == {'windows': 'a', 'linux': 'b', 'mac': 'b'}[OS_KEY]
+    assert c.snapshot()['tools']['editor'] == expected
+
+    # Sections without OS keys come back as-is, and can be written to
+    c['plain']['a'] = 2
+    assert c['plain']['a'] == 2
+
+    c['tools'] = {'editor': {'windows': 'x', 'linux': 'x', 'mac': 'x'}}
+    assert c['tools']['editor'] == 'x'
+    assert c.snapshot()['tools']['editor'] == 'x'
+
+
+
+def test_os_keys_lists(monkeypatch):
+    yaml_str = '''
+names: [{windows: a, linux: b, mac: b}, c]
+plain: [1, 2]
+'''
+    c = Configuration(default_yaml_text=yaml_str, use_os_keys=True)
+    calls = []
+    resolve = yamiconfig._resolve_os_keys
+
+    def counting(value):
+        if isinstance(value, list):
+            calls.append(value)
+        return resolve(value)
+    monkeypatch.setattr(yamiconfig, '_resolve_os_keys', counting)
+
+    # Lists are resolved once, not on every read
+    expected = [{'windows': 'a', 'linux': 'b', 'mac': 'b'}[OS_KEY], 'c']
+    assert c['names'] == expected
+    assert c['names'] is c['names']
+    assert len(calls) == 1
+
+    # ... until they are written
+    c['names'] = [{'windows': 'x', 'linux': 'x', 'mac': 'x'}]
+    assert c['names'] == ['x']
+    assert len(calls) == 2
+
+    # Lists without OS keys aren't copied, so changes to them are kept
+    c['plain'].append(3)
+    assert c['plain'] == [1, 2, 3]
+    assert not c.is_default('plain')
+
+
+def test_os_keys_write(temp_dir):
+    yaml_str = '''
+tools:
+    editor: {windows: notepad, linux: vi, mac: vi}
+    timeout: 1
+db: {windows: {port: 1}, linux: {port: 1}, mac: {port: 1}}
+'''
+    c = Configuration(default_yaml_text=yaml_str, use_os_keys=True)
+
+    # Sections holding OS keys are views, not copies; writes aren't lost
+    c['tools']['timeout'] = 5
+    c['tools']['editor'] = 'nano'
+    c['db']['port'] = 2
+    assert c['tools'] == {'editor': 'nano', 'timeout': 5}
+    assert c['db'] == {'port': 2}
+    assert c.snapshot()['tools'] == {'editor': 'nano', 'timeout': 5}
+    assert c.snapshot()['db'] == {'port': 2}
+    assert c._raw_view()['db'][OS_KEY] == {'port': 2}
+    assert not c.is_default('tools')
+
+    user = temp_dir.join("config-os-keys-user.yaml")
+    c.store_config(str(user))
+    text = user.read()
+    assert 'nano' in text and 'timeout: 5' in text and 'port: 2' in text
+
+
+def test_mapping(temp_dir):
+    default = temp_dir.join("config-mapping-default.yaml")
+    default.write('test1: 2\ntest3: 4\n')
+    user = temp_dir.join("config-mapping-user.yaml")
+    user.write('test3: 5\nuser1: 6\n')
+
+    c = Configuration(
+        default_config_file=str(default),
+        user_config_files=[str(user)])
+
+    assert len(c) == 3
+    assert list(c) == ['test1', 'test3', 'user1']
+    assert dict(c) == {'test1': 2, 'test3': 5, 'user1': 6}
+    assert c.keys() is c.keys()
+    assert list(c.items()) == [('test1', 2), ('test3', 5), ('user1', 6)]
+
+    c['extra'] = 1
+    c['user1'] = 7  # Shadows the file's value
+    assert len(c) == 4
+    assert 'extra' in c
+    assert c['user1'] == 7
+
+    del c['extra']
+    del c['test1']
+    assert 'extra' not in c
+    assert 'test1' not in c
+    assert len(c) == 2
+    with pytest.raises(KeyError):
+        del c['missing']
+
+    c.reset()
+    assert dict(c) == {'test1': 2, 'test3': 4}
+
+
+def test_paths():
+    yaml_str = '''
+db:
+    host: localhost
+    pool: {size: 2, timeout: 10}
+name: test
+'''
+    c = Configuration(default_yaml_text=yaml_str)
+    assert c.get_path('db.pool.size') == 2
+    assert c.get_path('name') == 'test'
+    assert c.get_path('db.pool') == {'size': 2, 'timeout': 10}
+    assert c.get_many(['db.host', 'db.pool.timeout']) == ['localhost', 10]
+    assert c.get_path('db.missing', None) is None
+    assert c.get_path('missing.x', None) is None
+    with pytest.raises(KeyError):
+        c.get_path('db.pool.missing')
+
+    c.set_path('db.pool.size', 5)
+    assert c.get_path('db.pool.size') == 5
+    assert c['db']['pool']['size'] == 5
+
+    c['db']['host'] = 'remote'
+    assert c.get_path('db.host') == 'remote'
+
+    c['extra'] = {'a': {'b': 1}}
+    c.set_path('extra.a.b', 2)
+    assert c.get_path('extra.a.b') == 2
+    assert c.snapshot()['extra']['a']['b'] == 2
+
+    # Writes made directly below a key publish too
+    c['extra']['a']['b'] = 3
+    assert c.get_path('extra.a.b') == 3
+    assert c.snapshot()['extra']['a']['b'] == 3
+    c['extra']['c'] = 4
+    assert c.get_path('extra.c') == 4
+    del c['extra']['a']
+    assert c.get_path('extra.a', None) is None
+    assert c.snapshot()['extra'] == {'c': 4}
+
+
+def test_lazy(temp_dir):
+    default = temp_dir.join("config-lazy.yaml")
+    default.write('''# Settings
+db:
+    host: localhost
+    pool: {size: 2}
+
+"name": test
+bad: oops
+''')
+
+    valid = Schema({'db': {'host': str, 'pool': {'size': int}}, 'name': str, 'bad': int})
+    c = Configuration(str(default), valid_schema=valid, lazy=True)
+    assert c._default.loaded == []
+    assert list(c) == ['db', 'name', 'bad']
+
+    assert c['db']['pool']['size'] == 2
+    assert c['name'] == 'test'
+    assert sorted(c._default.loaded) == ['db', 'name']
+
+    # Sections are only validated when they're loaded
+    with pytest.raises(SchemaError):
+        c['bad']
+
+    # Documents that can't be split are loaded in full
+    default.write('a: &x 1\nb: *x\n')
+    c = Configuration(str(default), lazy=True)
+    assert c['b'] == 1
+    assert type(c._default) is not LazySections
+
+    # So are documents whose schema isn't a plain dict schema
+    default.write('a: 1\nb: 2\n')
+    c = Configuration(str(default), valid_schema=Schema(And({str: int}, len)), lazy=True)
+    assert c['a'] == 1
+    assert type(c._default) is not LazySections
+    with pytest.raises(SchemaError):
+        Configuration(str(default), valid_schema=Schema(And({str: int}, lambda d: len(d) > 2)), lazy=True)
+
+
+def test_stats(temp_dir):
+    default = temp_dir.join("config-stats-default.yaml")
+    default.write('test1: 2\ntest3: 4\n')
+    user = temp_dir.join("config-stats-user.yaml")
+    user.write('test3: 5\n')
+
+    stats = LoadStats()
+    valid = Schema({Optional('test1'): int, Optional('test3'): int})
+    c = Configuration(
+        default_config_file=str(default), user_config_files=[str(user)],
+        valid_schema=valid, stats=stats)
+    c['test1']
+    c['test1']
+    c['test3']
+
+    files = stats.as_dict()['files']
+    assert set(files[str(default)]) == set(['read', 'parse', 'validate', 'bytes', 'keys'])
+    assert files[str(default)]['bytes'] == len('test1: 2\ntest3: 4\n')
+    assert files[str(user)]['keys'] == 1
+    assert files[str(user)]['bytes'] == len('test3: 5\n')
+
+    # User files are read while they're parsed; there's no separate read
+    assert set(files[str(user)]) == set(['parse', 'validate', 'bytes', 'keys'])
+    assert all(files[str(user)][phase] > 0 for phase in ('parse', 'validate'))
+    nodes = stats.as_dict()['nodes']
+    assert [node['calls'] for node in nodes if node['label'] == 'dict(2 keys)'] == [2]
+
+    # The two int leaves share a label but are counted apart
+    ints = [node['calls'] for node in nodes if node['label'] == 'int']
+    assert ints == [2, 1] or ints == [1, 2]
+    assert stats.hot_keys(1) == [('test1', 2)]
+
+
+@pytest.mark.parametrize('mmap_threshold', [0, 1 << 30])
+def test_multiple_documents(temp_dir, monkeypatch, mmap_threshold):
+    monkeypatch.setattr(yamiconfig, 'MMAP_THRESHOLD', mmap_threshold)
+
+    default = temp_dir.join("config-docs-default.yaml")
+    default.write('test1: 2\ndb: {host: a, port: 1}\n')
+    user = temp_dir.join("config-docs-user.yaml")
+    user.write('db: {host: b}\n---\n---\ndb: {port: 2}\ntest1: 3\n')
+
+    valid = Schema({Optional('test1'): int, Optional('db'): {Optional('host'): str, Optional('port'): int}})
+    for cache in (None, ConfigCache()):
+        c = Configuration(
+            default_config_file=str(default), user_config_files=[str(user)],
+            valid_schema=valid, cache=cache)
+        assert c['test1'] == 3
+        assert c['db'] == {'host': 'b', 'port': 2}
+
+    # Each document is validated
+    user.write('db: {host: b}\n---\ndb: {port: x}\n')
+    with pytest.raises(SchemaError):
+        Configuration(
+            default_config_file=str(default), user_config_files=[str(user)],
+            valid_schema=valid)
+
+
+def test_max_workers(temp_dir, capsys):
+    default = temp_dir.join("config-workers-default.yaml")
+    default.write('test1: 0\ntest3: {a: 0, b: 0}\n')
+    users = []
+    for index in range(20):
+        user = temp_dir.join("config-workers-%d.yaml" % index)
+        user.write('test1: %d\ntest3: {a: %d}\n' % (index, index) if index % 2 else
+                   'test3: {b: %d}\n' % index)
+        users.append(str(user))
+
+    schema = {Optional('test1'): int, 'test3': {Optional('a'): int, Optional('b'): int}}
+    c = Configuration(
+        default_config_file=str(default), user_config_files=users,
+        valid_schema=schema, max_workers=8)
+    assert c['test1'] == 19
+    assert c['test3'] == {'a': 19, 'b': 18}
+
+    # Every bad file is reported; the first one is raised
+    temp_dir.join("config-workers-3.yaml").write('test1: three\n')
+    temp_dir.join("config-workers-7.yaml").write('test1: seven\n')
+    with pytest.raises(SchemaError) as error:
+        c.load_configs()
+    assert error.value.config_file == users[3]
+
+    out = capsys.readouterr().out
+    assert users[3] in out and users[7] in out
+
+
+def test_overrides(temp_dir, monkeypatch):
+    default = temp_dir.join("config-env-default.yaml")
+    default.write('''
+debug: false
+name: app
+db:
+    pool-size: 2
+    timeout: 1.5
+    hosts: [a]
+''')
+    user = temp_dir.join("config-env-user.yaml")
+    user.write('db: {pool-size: 3}\n')
+
+    monkeypatch.setenv('APP__DEBUG', 'yes')
+    monkeypatch.setenv('APP__DB__POOL_SIZE', '10')
+    monkeypatch.setenv('APP__DB__HOSTS', '[b, c]')
+    monkeypatch.setenv('APP__UNKNOWN', '1')
+    c = Configuration(
+        default_config_file=str(default), user_config_files=[str(user)],
+        env_prefix='APP', argv=['--db.timeout=2.5', '--name', 'other'])
+    assert c['debug'] is True
+    assert c['db']['pool-size'] == 10
+    assert c['db']['timeout'] == 2.5
+    assert c['db']['hosts'] == ['b', 'c']
+    assert c['name'] == 'app'
+    assert 'UNKNOWN' not in c
+
+    # Overrides are applied again on every load, and stay above user files
+    monkeypatch.delenv('APP__DB__POOL_SIZE')
+    user.write('db: {pool-size: 4}\n')
+    c.load_configs()
+    assert c['db']['pool-size'] == 4
+    assert c.reload_file(str(user))
+    assert c['debug'] is True
+
+    monkeypatch.setenv('APP__DB__POOL_SIZE', 'ten')
+    with pytest.raises(SchemaError) as error:
+        c.load_configs()
+    assert error.value.config_file == 'APP__DB__POOL_SIZE'
+
+
+def test_overrides_schema(temp_dir, monkeypatch):
+    default = temp_dir.join("config-env-schema-default.yaml")
+    default.write('port: 80\nname: app\ndb: {pool__size: 2, dotted.key: 1}\nother: {a: 1}\n')
+    valid = Schema({
+        'port': And(int, lambda p: 0 < p < 65536), 'name': str,
+        'db': {'pool__size': int, 'dotted.key': int}, 'other': {'a': int}})
+
+    # Overrides are checked against the schema, not just the default's type
+    monkeypatch.setenv('APP__PORT', '70000')
+    with pytest.raises(SchemaError) as error:
+        Configuration(str(default), valid_schema=valid, env_prefix='APP')
+    assert error.value.config_file == 'APP__PORT'
+
+    # Only the sections that overrides name are loaded
+    monkeypatch.setenv('APP__PORT', '8080')
+    monkeypatch.setenv('APP__DB__POOL__SIZE', '3')
+    c = Configuration(
+        str(default), valid_schema=valid, env_prefix='APP', lazy=True,
+        argv=['--db.dotted.key=4'])
+    assert sorted(c._default.loaded) == ['db', 'port']
+    assert c['port'] == 8080
+    assert c['db'] == {'pool__size': 3, 'dotted.key': 4}
+
+    # Overrides aren't stored, but writes over them are
+    user = temp_dir.join("config-env-schema-user.yaml")
+    c.store_config(str(user))
+    assert user.read() == ''
+    c['name'] = 'other'
+    c.set_path('db.pool__size', 5)
+    c.store_config(str(user))
+    text = user.read()
+    assert 'name: other' in text and 'pool__size: 5' in text
+    assert 'dotted.key: 1' in text and '8080' not in text
+
+    c.reset(str(user))
+    assert c['port'] == 8080
+    assert user.read() == ''
+
+
+def test_list_writes(temp_dir):
+    default = temp_dir.join("config-lists-default.yaml")
+    default.write('hosts: [a, b]\ndb: {ports: [1]}\n')
+    user = temp_dir.join("config-lists-user.yaml")
+    c = Configuration(str(default))
+    before = c.snapshot()
+
+    # Lists changed in place are changes like any other
+    c['hosts'].append('c')
+    c['db']['ports'].append(2)
+    assert c['hosts'] == ['a', 'b', 'c']
+    assert not c.is_default('hosts')
+    assert before['hosts'] == ('a', 'b')
+    assert before['db']['ports'] == (1,)
+
+    c.store_config(str(user))
+    stored = Configuration(str(default), user_config_files=[str(user)])
+    assert stored['hosts'] == ['a', 'b', 'c']
+    assert stored['db']['ports'] == [1, 2]
+
+    c.reset()
+    assert c['hosts'] == ['a', 'b']
+    assert c['db']['ports'] == [1]
+    assert c.is_default('hosts')
+
+
+def test_store(temp_dir):
+    default = temp_dir.join("config-store-default.yaml")
+    default.write('''
+test1: 2
+db:
+    host: localhost  # The database host
+    port: 5432
+''')
+    c = Configuration(str(default))
+    user = temp_dir.join("config-store-user.yaml")
+
+    c.store_config(str(user))
+    assert user.read() == ''
+
+    c.set_path('db.port', 5433)
+    c.store_config(str(user))
+    text = user.read()
+    assert 'test1' not in text
+    assert 'port: 5433' in text
+    assert '# The database host' in text
+    assert Configuration(str(default), user_config_files=[str(user)])['db']['port'] == 5433
+    assert not [p for p in temp_dir.listdir() if p.ext == '.tmp']
+
+    c.store_defaults(str(user))
+    text = user.read()
+    assert text.startswith(yamiconfig.USER_CONFIG_HEADER)
+    assert '# test1: 2' in text
+    assert Configuration(str(default), user_config_files=[str(user)])['db']['port'] == 5432
+
+
+@pytest.mark.skipif(sys.platform.startswith('win'), reason='POSIX permissions')
+def test_store_keeps_file(temp_dir):
+    default = temp_dir.join("config-store-mode-default.yaml")
+    default.write('test1: 2\n')
+    c = Configuration(str(default))
+    c['test1'] = 3
+
+    # The permissions of the file are kept, and new files get the umask's
+    user = temp_dir.join("config-store-mode-user.yaml")
+    user.write('')
+    os.chmod(str(user), 0o644)
+    c.store_config(str(user))
+    assert os.stat(str(user)).st_mode & 0o777 == 0o644
+    c.store_defaults(str(user))
+    assert os.stat(str(user)).st_mode & 0o777 == 0o644
+
+    umask = os.umask(0o022)
+    try:
+        new = temp_dir.join("config-store-mode-new.yaml")
+        c.store_config(str(new))
+    finally:
+        os.umask(umask)
+    assert os.stat(str(new)).st_mode & 0o777 == 0o644
+
+    # A symlink stays a symlink; its target is replaced
+    link = temp_dir.join("config-store-mode-link.yaml")
+    os.symlink(str(user), str(link))
+    c.store_config(str(link))
+    assert os.path.islink(str(link))
+    assert 'test1: 3' in user.read()
+
+
+def test_compact(temp_dir):
+    default = temp_dir.join("config-compact-default.yaml")
+    default.write('''
+test1: 2.5
+servers:  # The servers
+    - {host: a, port: 1}
+    - {host: b, port: 2}
+db:
+    host: localhost  # The database host
+    port: 5432
+''')
+    user = temp_dir.join("config-compact-user.yaml")
+    user.write('db: {port: 5433}\n')
+
+    c = Configuration(str(default), user_config_files=[str(user)], compact=True)
+    assert type(c._default) is FrozenDict
+    assert type(c._default['test1']) is float
+    assert c['servers'][1]['port'] == 2
+    assert c['db']['port'] == 5433
+    assert c['db']['host'] == 'localhost'
+
+    # Maps with the same keys share their key index
+    first, second = c._default['servers']
+    assert first._index is second._index
+
+    # Snapshots use the compact data as-is
+    assert c.snapshot()['servers'] is c._default['servers']
+
+    c.set_path('db.host', 'remote')
+    assert c['db']['host'] == 'remote'
+    assert c._default['db']['host'] == 'localhost'
+
+    text = c.dump()
+    assert '# The database host' in text
+    assert 'host: remote' in text
+    assert 'port: 5433' in text
+
+    c.store_config(str(temp_dir.join("config-compact-stored.yaml")))
+    stored = temp_dir.join("config-compact-stored.yaml").read()
+    assert 'port: 5433' in stored and 'servers' not in stored
+
+    lazy = Configuration(str(default), compact=True, lazy=True)
+    assert type(lazy._default['db']) is FrozenDict
+
+
+def test_compact_shapes():
+    keys = ('shape-a', 'shape-b')
+    first = FrozenDict([(keys[0], 1), (keys[1], 2)])
+    second = FrozenDict([(keys[0], 3), (keys[1], 4)])
+    assert first._index is second._index
+
+    # A key index is dropped once no map uses it
+    del first, second
+    gc.collect()
+    assert keys not in yamiconfig.frozen._SHAPES
+
+
+def test_validate_writes(temp_dir):
+    default = temp_dir.join("config-writes.yaml")
+    default.write('''
+test1: 2
+db:
+    pool: {size: 2, timeout: 1}
+level: {name: debug}
+''')
+    schema = {
+        'test1': int,
+        'db': {'pool': {'size': int, 'timeout': int}},
+        'level': Or(int, {'name': str}),
+    }
+    c = Configuration(str(default), valid_schema=schema, validate_writes=True)
+
+    c['test1'] = 3
+    c.set_path('db.pool.size', 5)
+    c['db']['pool']['timeout'] = 6
+    c['level']['name'] = 'info'
+    c['extra'] = 'not in the schema'
+    assert c['db']['pool'] == {'size': 5, 'timeout': 6}
+
+    for path, value in [
+        ('test1', 'x'), ('db.pool.size', 'x'), ('db.pool.other', 1),
+        ('db.pool', {'size': 1}), ('level.name', 1),
+    ]:
+        with pytest.raises(SchemaError):
+            c.set_path(path, value)
+    assert c['db']['pool'] == {'size': 5, 'timeout': 6}
+    assert c['level']['name'] == 'info'
+
+    # The sub-schema of a path is only looked up once
+    compiled = c.schema.compile()
+    assert compiled.item_schema(('db', 'pool')) is compiled.item_schema(('db', 'pool'))
+
+    # Writes below a replaced section are checked too
+    c['db'] = {'pool': {'size': 1, 'timeout': 1}}
+    with pytest.raises(SchemaError):
+        c.set_path('db.pool.size', 'not-an-int')
+    with pytest.raises(SchemaError):
+        c['db']['pool']['size'] = 'x'
+    with pytest.raises(SchemaError):
+        c['db']['pool'] = {'size': 'x', 'timeout': 1}
+    c['db']['pool']['size'] = 7
+    assert c['db'] == {'pool': {'size': 7, 'timeout': 1}}
+    assert c.snapshot()['db']['pool']['size'] == 7
+
+    c['level'] = {'name': 'warn'}
+    with pytest.raises(SchemaError):
+        c['level']['name'] = 1
+    assert c['level']['name'] == 'warn'
+
+
+def test_validate_writes_extra(temp_dir):
+    default = temp_dir.join("config-writes-extra.yaml")
+    default.write('test1: 2\n')
+    user = temp_dir.join("config-writes-extra-user.yaml")
+    user.write('user1: {a: 1}\n')
+    schema = {
+        Optional('test1'): int,
+        Optional('extra'): int,
+        Optional('user1'): {'a': int},
+        Optional('section'): {'b': int},
+    }
+    c = Configuration(
+        str(default), user_config_files=[str(user)], valid_schema=schema,
+        validate_writes=True, ignore_extra_keys=True)
+
+    # Keys the schema names are checked, even if the default doesn't have them
+    c['extra'] = 1
+    c['user1']['a'] = 2
+    c['section'] = {'b': 1}
+    c['section']['b'] = 2
+    for key, value in [('extra', 'x'), ('user1', {'a': 'x'}), ('section', {'b': 'x'})]:
+        with pytest.raises(SchemaError):
+            c[key] = value
+    with pytest.raises(SchemaError):
+        c['section']['b'] = 'x'
+    assert (c['extra'], c['user1'], c['section']) == (1, {'a': 2}, {'b': 2})
+
+    # Other keys aren't
+    c['unknown'] = 'anything'
+
+
+def test_validate_writes_os_keys():
+    yaml_str = '''
+db: {windows: {port: 1}, linux: {port: 1}, mac: {port: 1}}
+'''
+    ports = {'port': int}
+    schema = {'db': Or({'windows': ports, 'linux': ports, 'mac': ports}, None)}
+    c = Configuration(
+        default_yaml_text=yaml_str, valid_schema=schema, use_os_keys=True,
+        validate_writes=True)
+
+    # The schema is walked along the path as written, OS key included
+    c['db']['port'] = 2
+    assert c['db'] == {'port': 2}
+    with pytest.raises(SchemaError):
+        c['db']['port'] = 'x'
+    assert c['db'] == {'port': 2}
+
+
 def test_validate(temp_dir):
     p1 = temp_dir.join("config-basic.yaml")
     p1.write('''
@@ -77,6 +738,20 @@ test3: 4
         Configuration(str(p1), valid_schema=valid)
 
 
+def test_collect_errors(temp_dir):
+    p1 = temp_dir.join("config-collect.yaml")
+    p1.write('''
+test1: a
+test3: b
+    ''')
+
+    valid = Schema({'test1': int, 'test3': int})
+    with pytest.raises(SchemaErrorList) as info:
+        Configuration(str(p1), valid_schema=valid, collect_errors=True)
+    assert sorted(x.path for x in info.value.all_errors) == [('test1',), ('test3',)]
+    assert 'test3: ' in str(info.value)
+
+
 def test_exceptions():
     with pytest.raises(ValueError):
         Configuration()
@@ -89,6 +764,303 @@ def test_loads():
     assert c['test3'] == 4
 
 
+def test_cache(temp_dir):
+    default = temp_dir.join("config-cache-default.yaml")
+    default.write('test1: 2\ntest3: 4\n')
+    user = temp_dir.join("config-cache-user.yaml")
+    user.write('test3: 5\n')
+
+    cache = ConfigCache(cache_dir=str(temp_dir.join('cache')))
+    c = Configuration(
+        default_config_file=str(default),
+        user_config_files=[str(user)],
+        cache=cache)
+    assert c['test3'] == 5
+    assert len(cache) == 1
+
+    # Hits return copies, so changes don't leak back into the cache
+    data = c.load_file(str(user))
+    data['test3'] = 6
+    assert c.load_file(str(user))['test3'] == 5
+
+    # A new in-memory cache can be filled from the disk copies
+    stats = LoadStats()
+    other = ConfigCache(cache_dir=str(temp_dir.join('cache')))
+    c = Configuration(
+        default_config_file=str(default), user_config_files=[str(user)],
+        cache=other, stats=stats)
+    assert c['test3'] == 5
+    assert 'cache' in stats.files[str(user)]
+    assert 'parse' not in stats.files[str(user)]
+
+    user.write('test3: 70\n')
+    c.load_configs()
+    assert c['test3'] == 70
+
+    # Schemas that differ only in a callable don't share entries
+    def make(check):
+        return Configuration(
+            default_config_file=str(default), user_config_files=[str(user)],
+            valid_schema=Schema({str: And(int, check)}), cache=cache)
+
+    assert make(lambda v: v >= 0)['test3'] == 70
+    with pytest.raises(SchemaError):
+        make(lambda v: v < 10)
+
+
+def test_artifact(temp_dir, monkeypatch):
+    default = temp_dir.join("config-artifact-default.yaml")
+    default.write('test1: 2\ntest3: {a: 4}\n')
+    user = temp_dir.join("config-artifact-user.yaml")
+    user.write('test3: {a: 5}\n')
+    artifact = str(temp_dir.join('config.yamic'))
+    schema = {Optional('test1'): int, 'test3': {'a': int}}
+
+    assert yamiconfig.__main__.main([
+        'compile', '--default', str(default), '--user', str(user),
+        '--output', artifact]) == 0
+
+    def make(**kwargs):
+        return Configuration(
+            default_config_file=str(default), user_config_files=[str(user)],
+            artifact=artifact, **kwargs)
+
+    # The artifact was compiled without a schema
+    stats = LoadStats()
+    c = make(stats=stats)
+    assert c['test3']['a'] == 5
+    assert c.is_default('test1') and not c.is_default('test3')
+    assert 'artifact' in stats.files[artifact]
+    assert not make(valid_schema=schema).load_artifact(artifact)
+
+    c = make(valid_schema=schema)
+    c.compile(artifact)
+    assert make(valid_schema=schema).load_artifact(artifact)
+
+    # Touching a file without changing it keeps the artifact fresh
+    user.write('test3: {a: 5}\n')
+    assert c.load_artifact(artifact)
+
+    user.write('test3: {a: 6}\n')
+    c = make(valid_schema=schema)
+    assert c['test3']['a'] == 6
+    assert not c.load_artifact(artifact)
+    assert not c.load_artifact(str(temp_dir.join('missing.yamic')))
+
+    # Artifacts are only used with the loader (and ruamel.yaml) they were
+    # compiled with
+    c = make(loader='fast')
+    c.compile(artifact)
+    assert make(loader='fast').load_artifact(artifact)
+    assert not make().load_artifact(artifact)
+    monkeypatch.setitem(
+        yamiconfig.artifact._LOADERS, 'fast', ['fast', ['ruamel.yaml', 1, 2], None])
+    assert not make(loader='fast').load_artifact(artifact)
+
+
+def test_artifact_write(temp_dir, monkeypatch):
+    default = temp_dir.join("config-artifact-write.yaml")
+    default.write('test1: 2\n')
+    artifact = temp_dir.join('config-write.yamic')
+    c = Configuration(str(default))
+
+    # A new artifact is readable by others, as a plain file would be
+    umask = os.umask(0o022)
+    try:
+        c.compile(str(artifact))
+    finally:
+        os.umask(umask)
+    assert (os.stat(str(artifact)).st_mode & 0o777) == 0o644
+
+    # A failed write leaves neither a temporary file nor a changed artifact
+    before = artifact.read_binary()
+
+    monkeypatch.setattr(yamiconfig.artifact, '_LENGTH', None)
+    with pytest.raises(AttributeError):
+        yamiconfig.artifact.write_artifact(str(artifact), {}, [])
+    monkeypatch.undo()
+    assert artifact.read_binary() == before
+    assert not [name for name in os.listdir(str(temp_dir)) if name.endswith('.tmp')]
+
+
+def test_import_footprint(temp_dir):
+    default = temp_dir.join("config-import.yaml")
+    default.write('test1: 2\ntest3: {a: 4}\n')
+    artifact = str(temp_dir.join('config-import.yamic'))
+    Configuration(str(default)).compile(artifact)
+
+    # Neither importing nor loading an artifact needs YAML or schema code
+    code = (
+        'import sys\n'
+        'from yamiconfig import Configuration\n'
+        'c = Configuration(%r, artifact=%r)\n'
+        'assert c["test3"]["a"] == 4\n'
+        'print(sorted(m for m in sys.modules if m.startswith(("ruamel", "yamiconfig.schema"))))\n'
+    ) % (str(default), artifact)
+    output = subprocess.check_output(
+        [sys.executable, '-c', code], universal_newlines=True,
+        cwd=os.path.dirname(os.path.dirname(yamiconfig.__file__)))
+    assert output.strip() == '[]'
+
+    # Schema names are still available from the package
+    assert yamiconfig.SchemaError is SchemaError
+
+
+def test_cache_eviction(temp_dir):
+    cache = ConfigCache(max_entries=2)
+    for index in range(3):
+        p = temp_dir.join("config-evict-%d.yaml" % index)
+        p.write('test1: %d\n' % index)
+        cache.load(str(p), lambda raw: raw)
+    assert len(cache) == 2
+
+
+def test_fast_loader(temp_dir):
+    default = temp_dir.join("config-fast.yaml")
+    default.write('test1: 2  # comment\ntest3: {a: 4}\n')
+
+    c = Configuration(str(default), loader='fast')
+    assert isinstance(c['test3'], dict)
+    assert type(c._default['test3']) is dict
+    assert json.loads(json.dumps(dict(c))) == {'test1': 2, 'test3': {'a': 4}}
+    assert json.dumps(c['test3']) == '{"a": 4}'
+    assert c['test3']['a'] == 4
+    assert 'test1: 2' in c.dump()
+
+    with pytest.raises(ValueError):
+        Configuration(str(default), loader='slow')
+
+
+def _wait_for(condition, timeout=5.0):
+    end = time.time() + timeout
+    while not condition():
+        if time.time() > end:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.mark.parametrize('use_inotify', [False, True])
+def test_watch(temp_dir, use_inotify):
+    default = temp_dir.join("config-watch-default-%s.yaml" % use_inotify)
+    default.write('test1: 2\ntest3: {a: 4, b: 5}\n')
+    user = temp_dir.join("config-watch-user-%s.yaml" % use_inotify)
+    user.write('test3: {a: 6}\n')
+
+    c = Configuration(
+        default_config_file=str(default),
+        user_config_files=[str(user)])
+    c['test1'] = 10
+
+    reloaded = []
+    with c.watch(interval=0.02, use_inotify=use_inotify, on_reload=reloaded.append):
+        user.write('test3: {a: 7, b: 8}\n')
+        assert _wait_for(lambda: c['test3']['b'] == 8)
+        assert c['test3']['a'] == 7
+        assert set(reloaded) == set([str(user)])
+
+        # Runtime writes survive a reload
+        assert c['test1'] == 10
+
+        default.write('test1: 3\ntest3: {a: 4, b: 5}\ntest4: 1\n')
+        assert _wait_for(lambda: 'test4' in c._default)
+        assert c['test4'] == 1
+
+
+def test_snapshot(temp_dir):
+    default = temp_dir.join("config-snapshot.yaml")
+    default.write('test1: 2\ntest3: {a: [1, 2], b: 5}\n')
+
+    c = Configuration(str(default))
+    snap = c.snapshot()
+    assert snap['test3']['a'] == (1, 2)
+    assert snap == {'test1': 2, 'test3': {'a': (1, 2), 'b': 5}}
+    assert hash(snap) == hash(c.snapshot())
+
+    with pytest.raises(TypeError):
+        snap['test1'] = 3
+    with pytest.raises(TypeError):
+        snap['test3']['b'] = 3
+
+    # Writes publish a new snapshot and leave the old one alone
+    c['test1'] = 3
+    c['test3']['b'] = 6
+    c['other'] = {'x': [1]}
+    assert snap['test1'] == 2
+    assert snap['test3']['b'] == 5
+    assert 'other' not in snap
+
+    new = c.snapshot()
+    assert new['test1'] == 3
+    assert new['test3']['b'] == 6
+    assert new['other'] == {'x': (1,)}
+
+    # Writes to replaced sections publish, and lists changed in place are
+    # picked up by the next snapshot
+    c['test3'] = {'a': [7], 'b': {'c': 1}}
+    c['test3']['b']['c'] = 2
+    assert c.snapshot()['test3']['b']['c'] == 2
+    c['test3']['a'].append(8)
+    c['test1'] = 4
+    assert c.snapshot()['test3']['a'] == (7, 8)
+    c['other']['x'].append(2)
+    c['test1'] = 5
+    assert c.snapshot()['other'] == {'x': (1, 2)}
+
+    c.reset()
+    assert c.snapshot() == snap
+
+
+def test_shared(temp_dir):
+    default = temp_dir.join("config-shared.yaml")
+    default.write(
+        'test1: 2\n'
+        'test3: {a: [1, 2], b: {c: x, d: null}, e: {}}\n'
+        'test3a: 4\n')
+    path = str(temp_dir.join("config.shared"))
+
+    c = Configuration(str(default))
+    assert c.share(path) == 1
+
+    shared = SharedConfig(path)
+    assert shared.version == 1
+    if not sys.platform.startswith('win'):
+        # Workers may run as other users
+        assert os.stat(path).st_mode & 0o777 == 0o644
+    assert list(shared) == ['test1', 'test3', 'test3a']
+    assert shared['test1'] == 2
+    assert list(shared['test3']) == ['a', 'b', 'e']
+    assert shared['test3']['a'] == [1, 2]
+    assert shared['test3']['e'] == {}
+    assert shared.get_path('test3.b.c') == 'x'
+    assert shared.get_path('test3.b.d', 'missing') is None
+    assert shared.get_path('test3.b.z', 'missing') == 'missing'
+    assert dict(shared['test3']['b']) == {'c': 'x', 'd': None}
+    assert 'test3a' in shared
+    assert 'test' not in shared
+    with pytest.raises(KeyError):
+        shared['test3']['z']
+    assert not shared.refresh()
+
+    # Readers keep the old version until they refresh
+    section = shared['test3']
+    c['test3']['b']['c'] = 'y'
+    c['new'] = 5
+    assert c.share(path) == 2
+    assert shared['test1'] == 2
+    assert 'new' not in shared
+
+    assert shared.refresh()
+    assert shared.version == 2
+    assert shared.get_path('test3.b.c') == 'y'
+    assert shared['new'] == 5
+    assert section['b']['c'] == 'x'
+
+    c.share(path, mode=0o600)
+    if not sys.platform.startswith('win'):
+        assert os.stat(path).st_mode & 0o777 == 0o600
+
+
 def main():
     test_basic()
 
@@ -0,0 +1,114 @@
+import copy
+import json
+import pickle
+import pytest
+from yamiconfig.overlay import Overlay
+
+
+def test_layers():
+    base = {'a': 1, 'b': {'c': 2, 'd': {'e': 3}}}
+    user = {'b': {'d': {'e': 4}, 'f': 5}}
+    o = Overlay([base, user])
+
+    assert o['a'] == 1
+    assert o['b']['c'] == 2
+    assert o['b']['d']['e'] == 4
+    assert list(o['b']) == ['c', 'd', 'f']
+    assert o.to_dict() == {'a': 1, 'b': {'c': 2, 'd': {'e': 4}, 'f': 5}}
+    assert len(o) == 2
+
+
+def test_writes():
+    base = {'a': 1, 'b': {'c': 2}}
+    o = Overlay([base])
+
+    b = o['b']
+    b['c'] = 3
+    b['x'] = 4
+    assert o['b'] == {'c': 3, 'x': 4}
+    assert base == {'a': 1, 'b': {'c': 2}}
+
+    # Replacing a section replaces it, rather than merging
+    o['b'] = {'y': 5}
+    assert o['b'] == {'y': 5}
+    b['c'] = 6
+    assert o['b'] == {'y': 5}
+
+    # ... and writes below it are seen like any other
+    seen = []
+    o.on_change = seen.append
+    o['b']['z'] = {'w': 1}
+    o['b']['z']['w'] = 2
+    assert seen == [('b', 'z'), ('b', 'z', 'w')]
+    assert o.to_dict()['b'] == {'y': 5, 'z': {'w': 2}}
+
+    del o['a']
+    assert 'a' not in o
+    assert list(o) == ['b']
+    with pytest.raises(KeyError):
+        del o['a']
+    assert base['a'] == 1
+
+
+def test_lazy_views():
+    base = {'a': {'b': {'c': {'d': 1}}, 'e': {'f': 2}}}
+    o = Overlay([base])
+
+    # Only the levels that are handed out are filled
+    a = o['a']
+    assert dict.__len__(a) == 2
+    b = dict.__getitem__(a, 'b')
+    assert dict.__len__(b) == 0
+    assert a['b'] is b
+    assert dict.__len__(b) == 1
+    assert dict.__len__(dict.__getitem__(b, 'c')) == 0
+    assert json.loads(json.dumps(a)) == base['a']
+
+
+def test_lists():
+    base = {'a': [1, 2], 'b': {'c': [3]}}
+    o = Overlay([base])
+
+    # Lists are copied when they're read, so the layers never change
+    o['a'].append(3)
+    o['b']['c'].append(4)
+    assert o.to_dict() == {'a': [1, 2, 3], 'b': {'c': [3, 4]}}
+    assert base == {'a': [1, 2], 'b': {'c': [3]}}
+
+    # Copies that are still the same don't hide a new layer
+    o = Overlay([base])
+    assert o['a'] == [1, 2]
+    o['b']['c'].append(4)
+    new = o.with_layer(0, {'a': [5], 'b': {'c': [6]}})
+    assert new['a'] == [5]
+    assert new['b']['c'] == [3, 4]
+
+
+def test_dict_contract():
+    base = {'a': 1, 'b': {'c': 2, 'd': {'e': 3}}}
+    user = {'b': {'d': {'e': 4}}}
+    o = Overlay([base, user])
+
+    b = o['b']
+    assert isinstance(b, dict)
+    assert isinstance(b['d'], dict)
+    assert json.loads(json.dumps(b)) == {'c': 2, 'd': {'e': 4}}
+    assert dict(b) == {'c': 2, 'd': {'e': 4}}
+    assert b == {'c': 2, 'd': {'e': 4}}
+
+    # Writes through the view update both the view and the overlay
+    b['d']['f'] = 5
+    b.update(x=6)
+    b |= {'y': 7}
+    del b['c']
+    assert json.loads(json.dumps(o['b'])) == {'d': {'e': 4, 'f': 5}, 'x': 6, 'y': 7}
+    assert o.to_dict()['b'] == dict(b)
+    assert base == {'a': 1, 'b': {'c': 2, 'd': {'e': 3}}}
+
+    # Copies are plain dicts, detached from the overlay
+    for other in (copy.copy(b), copy.deepcopy(b), pickle.loads(pickle.dumps(b))):
+        assert type(other) is dict
+        assert other == b
+    clone = copy.deepcopy(b)
+    clone['d']['f'] = 0
+    assert b['d']['f'] == 5
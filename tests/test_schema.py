@@ -0,0 +1,205 @@
+import pytest
+from yamiconfig.schema import (
+    Schema, SchemaError, And, Or, Regex, Use, Optional, Forbidden,
+    SchemaMissingKeyError, SchemaWrongKeyError, ValidationMemo)
+
+
+def _both(schema, data):
+    '''Run the interpreted and compiled validators; return both outcomes.'''
+    results = []
+    for validate in (schema.validate, schema.compile().validate):
+        try:
+            results.append(('ok', validate(data)))
+        except SchemaError as x:
+            results.append((type(x), x.code))
+    return results
+
+
+def test_compile_matches_validate():
+    schema = Schema({
+        'name': And(str, len),
+        'port': Or(int, Use(int)),
+        Optional('debug', default=False): bool,
+        Optional('host'): Regex(r'^[a-z.]+$'),
+        Forbidden('password'): str,
+        'servers': [{'url': str, Optional('weight'): int}],
+        str: object,
+    })
+
+    samples = [
+        {'name': 'a', 'port': 80, 'servers': []},
+        {'name': 'a', 'port': '80', 'servers': [{'url': 'x'}], 'extra': 1},
+        {'name': '', 'port': 80, 'servers': []},
+        {'name': 'a', 'port': 'x', 'servers': []},
+        {'name': 'a', 'port': 80, 'servers': [], 'password': 'p'},
+        {'name': 'a', 'port': 80, 'servers': [], 'password': 1},
+        {'name': 'a', 'port': 80, 'servers': [{'weight': 1}]},
+        {'name': 'a', 'port': 80, 'servers': [], 'host': 'A'},
+        {'port': 80, 'servers': []},
+        [1, 2],
+    ]
+
+    for sample in samples:
+        interpreted, compiled = _both(schema, sample)
+        assert interpreted == compiled
+
+
+def test_compile_wrong_keys():
+    schema = Schema({'a': int, Optional('b'): int})
+    interpreted, compiled = _both(schema, {'a': 1, 'c': 2})
+    assert compiled[0] != 'ok'
+    assert interpreted == compiled
+
+    schema = Schema({'a': int}, ignore_extra_keys=True)
+    assert schema.compile().validate({'a': 1, 'c': 2}) == {'a': 1}
+
+
+def test_compile_is_cached():
+    schema = Schema({'a': int})
+    assert schema.compile() is schema.compile()
+
+    with pytest.raises(SchemaError):
+        schema.compile().validate({'a': 'x'})
+
+
+def test_validate_item():
+    compiled = Schema(Schema({'a': int, Optional('b'): Use(int)})).compile()
+    assert compiled.validate_item('a', 1) == ('a', 1)
+    assert compiled.validate_item('b', '2') == ('b', 2)
+
+    with pytest.raises(SchemaError):
+        compiled.validate_item('a', 'x')
+    with pytest.raises(SchemaError):
+        compiled.validate_item('c', 1)
+    with pytest.raises(TypeError):
+        Schema(int).compile().validate_item('a', 1)
+
+    nested = Schema({'db': {'pool': {'size': int}}, 'level': Or({'a': int}, int)}).compile()
+    assert nested.validate_item('size', 2, parent=('db', 'pool')) == ('size', 2)
+    with pytest.raises(SchemaError):
+        nested.validate_item('size', 'x', parent=('db', 'pool'))
+    assert nested.item_schema(('db', 'pool')) is nested.item_schema(('db', 'pool'))
+    assert nested.item_schema(('level',)) is None
+    assert nested.item_schema(('missing', 'key')) is None
+
+
+def test_validate_all():
+    schema = Schema({
+        'name': str,
+        'db': {'host': str, 'port': int},
+        'servers': [{'url': str}],
+        'level': Or(int, 'debug'),
+    })
+
+    assert schema.validate_all(
+        {'name': 'a', 'db': {'host': 'h', 'port': 1}, 'servers': [], 'level': 1}) == []
+
+    errors = schema.validate_all({
+        'name': 1,
+        'db': {'host': 'h', 'port': 'x', 'extra': 1},
+        'servers': [{'url': 'u'}, {'url': 2}, {}],
+        'level': 'info',
+    })
+    found = dict((x.path, type(x)) for x in errors)
+    assert found == {
+        ('name',): SchemaError,
+        ('db', 'port'): SchemaError,
+        ('db',): SchemaWrongKeyError,
+        ('servers', 1, 'url'): SchemaError,
+        ('servers', 2): SchemaMissingKeyError,
+        ('level',): SchemaError,
+    }
+
+    errors = schema.validate_all({'name': 'a'})
+    assert [type(x) for x in errors] == [SchemaMissingKeyError]
+    assert schema.validate_all(5)[0].path == ()
+
+
+class _TryAll(Schema):
+    '''Turns off ``Or`` dispatch, for comparison'''
+    pass
+
+
+def test_or_dispatch():
+    variants = [
+        {'type': 'http', 'url': str, Optional('port'): int},
+        {'type': 'grpc', 'host': str},
+        {'type': 'kafka', 'topic': str, Optional('port'): Use(int)},
+        {'kind': 'other'},
+        int, 'debug', [str], lambda x: x == 2.5,
+    ]
+    samples = [
+        {'type': 'http', 'url': 'u'}, {'type': 'http', 'url': 1},
+        {'type': 'grpc', 'host': 'h'}, {'type': 'kafka', 'topic': 't', 'port': '9'},
+        {'type': 'nope'}, {'type': ['x']}, {'kind': 'other'}, {},
+        1, True, 'debug', 'info', ['a'], [1], 2.5, None,
+    ]
+    fast = Schema([Or(*variants)])
+    slow = Schema([Or(*variants, schema=_TryAll)])
+    assert Or(*variants)._dispatcher().key == 'type'
+
+    for sample in samples:
+        expected = _both(slow, [sample])
+        assert _both(fast, [sample]) == expected
+        assert expected[0] == expected[1]
+
+    # Only the matching variant is tried
+    calls = []
+    spy = Or({'type': 'b', 'v': Use(lambda v: calls.append(v) or v)}, {'type': 'a', 'v': int})
+    data = [dict([('v', 1), ('type', 'a')])] * 3 + [{'type': 'b', 'v': 2}]
+    Schema([spy]).compile().validate(data)
+    Schema([spy]).validate(data)
+    assert calls == [2, 2]
+
+    named = Or({'a': 1, 'b': 1}, {'a': 2, 'b': 2}, discriminator='b')
+    assert named._dispatcher().key == 'b'
+    assert named.validate({'a': 2, 'b': 2}) == {'a': 2, 'b': 2}
+
+
+def test_memo():
+    calls = []
+
+    def count(value):
+        calls.append(value)
+        return value
+
+    host = {'name': str, 'port': Use(int), 'tags': [Regex('^[a-z]+$')],
+            Optional('extra'): Use(count)}
+    schema = Schema({'hosts': [host], 'level': Or(int, 'debug')})
+    data = {'hosts': [{'name': 'h', 'port': '80', 'tags': ['a', 'b']}] * 50, 'level': 1}
+    data['hosts'].append({'name': 'h', 'port': 80, 'tags': ['a', 'b']})
+
+    memo = ValidationMemo(maxsize=100)
+    compiled = schema.compile(memo=memo)
+    assert compiled is schema.compile(memo=memo)
+    assert compiled.validate(data) == schema.validate(data)
+    assert memo.hits >= 49
+    # Types are part of the key: '80' and 80 are different hosts
+    assert compiled.validate(data)['hosts'][-1]['port'] == 80
+
+    with pytest.raises(SchemaError) as error:
+        compiled.validate({'hosts': [{'name': 1, 'port': 1, 'tags': []}], 'level': 1})
+    with pytest.raises(SchemaError) as again:
+        compiled.validate({'hosts': [{'name': 1, 'port': 1, 'tags': []}], 'level': 1})
+    assert again.value.code == error.value.code
+
+    # Impure ``Use`` callables run every time
+    extra = dict(data['hosts'][0], extra=1)
+    compiled.validate({'hosts': [extra] * 3, 'level': 1})
+    assert calls == [1, 1, 1]
+
+    assert len(memo) <= 100
+
+
+def test_memo_floats():
+    memo = ValidationMemo()
+    compiled = Schema([{'v': Use(str)}]).compile(memo=memo)
+
+    # 0.0 == -0.0, but they validate to different values
+    data = [{'v': 0.0}, {'v': -0.0}, {'v': 0.0}]
+    assert compiled.validate(data) == [{'v': '0.0'}, {'v': '-0.0'}, {'v': '0.0'}]
+
+    # NaN isn't equal to itself, but can be looked up
+    hits = memo.hits
+    assert compiled.validate([{'v': float('nan')}] * 3) == [{'v': 'nan'}] * 3
+    assert memo.hits >= hits + 2
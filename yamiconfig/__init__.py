@@ -8,12 +8,34 @@ Yet another configuration object!
 from __future__ import print_function
 import os
 import sys
-import copy
-import collections
-from ruamel.yaml import YAML
-from ruamel.yaml.compat import StringIO
-
-from .schema import Schema, SchemaError
+import mmap
+import threading
+
+# ruamel.yaml, ``.schema`` and ``tempfile`` are imported where they're used:
+# loading from an artifact, or from data that's already parsed, needs none of
+# them, and importing them is most of the time a short-lived tool spends here.
+from .cache import ConfigCache, schema_fingerprint  # noqa: F401
+from .artifact import ArtifactError, fingerprint, is_fresh, read_artifact, write_artifact, _atomic_open
+from .overlay import Overlay
+from .frozen import compact as _compact_data, thaw
+from .lazy import LazySections, index_sections
+from .stats import LoadStats, clock  # noqa: F401
+
+try:
+    from collections.abc import Mapping, MutableMapping, KeysView, ItemsView, ValuesView
+except ImportError:  # Python 2
+    from collections import Mapping, MutableMapping, KeysView, ItemsView, ValuesView
+
+if sys.version_info < (3, 7):
+    # No module ``__getattr__``
+    from .schema import Schema, SchemaError, SchemaErrorList  # noqa: F401
+else:
+    def __getattr__(name):
+        '''``Schema``, ``SchemaError`` and ``SchemaErrorList``, on first use'''
+        if name in ('Schema', 'SchemaError', 'SchemaErrorList'):
+            from . import schema
+            return getattr(schema, name)
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
 
 
 # Metadata ####################################################################
@@ -31,84 +53,434 @@ USER_CONFIG_HEADER = (
 )
 
 
+# User config files at least this big are memory-mapped rather than read
+MMAP_THRESHOLD = 8 * 1024 * 1024
+
+# ``Configuration`` loaders.  The round-trip loader keeps comments and
+# formatting; the fast loader uses libyaml (when available) and plain dicts.
+LOADERS = ('roundtrip', 'fast')
+
+
 (IS_WIN, IS_LIN, IS_MAC) = (
     'win' in sys.platform,
     'lin' in sys.platform,
     'darwin' in sys.platform)
 
 
+# With ``use_os_keys``, a mapping that only has these keys is replaced by the
+# value for the current platform.
+OS_KEYS = frozenset(['windows', 'linux', 'mac'])
+OS_KEY = 'windows' if IS_WIN else ('mac' if IS_MAC else 'linux')
+
+_MISSING = object()
+
+
+def _resolve_os_keys(value):
+    '''
+    Return ``value`` with every OS-keyed mapping in it replaced by its value
+    for the current platform.  Containers that hold no OS-keyed mappings are
+    returned as-is, not copied.
+    '''
+    if isinstance(value, Mapping):
+        if value and OS_KEYS.issuperset(value):
+            return _resolve_os_keys(value[OS_KEY])
+
+        resolved = {}
+        changed = False
+        for key, item in value.items():
+            resolved[key] = _resolve_os_keys(item)
+            changed = changed or (resolved[key] is not item)
+        return resolved if changed else value
+
+    if isinstance(value, (list, tuple)):
+        resolved = [_resolve_os_keys(item) for item in value]
+        if any(new is not old for (new, old) in zip(resolved, value)):
+            return tuple(resolved) if isinstance(value, tuple) else resolved
+
+    return value
+
+
+def _os_value(value):
+    '''
+    The ``Overlay`` ``resolve`` hook for ``use_os_keys``: an OS-keyed
+    mapping (a view) gives the view of the value for this platform, so
+    writes to it reach the settings.  Lists that hold OS-keyed mappings are
+    resolved as copies (once per list; see ``Overlay._lookup``), others are
+    returned as they are.
+    '''
+    if isinstance(value, Mapping):
+        if value and OS_KEYS.issuperset(value):
+            return value[OS_KEY]
+        return value
+    return _resolve_os_keys(value)
+
+
 # The configuration class
-class Configuration(collections.MutableMapping):
+class Configuration(MutableMapping):
     '''YAML-based configuration settings'''
     def __init__(
         self, default_config_file=None, default_yaml_text=None,
         user_config_files=None, valid_schema=None, ignore_extra_keys=False,
-        use_os_keys=False
+        use_os_keys=False, cache=None, loader='roundtrip', lazy=False,
+        stats=None, collect_errors=False, artifact=None, max_workers=None,
+        env_prefix=None, argv=None, compact=False, validate_writes=False,
+        validation_memo=None
     ):
+        if loader not in LOADERS:
+            raise ValueError("`loader` must be one of: %s" % ', '.join(LOADERS))
+
         self.default_file = default_config_file
         self.user_files = user_config_files or []
 
+        # An optional ``LoadStats`` that records where loading time goes
+        self.stats = stats
+
         if not (default_config_file or default_yaml_text):
             raise ValueError("Must use either `default_config_file` or `default_yaml_text`")
 
         if default_config_file:
-            with open(default_config_file) as fh:
-                self._default_raw = fh.read()
+            self._default_raw = self._read(default_config_file)
         else:
             self._default_raw = default_yaml_text
 
         if valid_schema:
-            self.schema = Schema(valid_schema, ignore_extra_keys=ignore_extra_keys)
+            from . import schema
+            self.schema = schema.Schema(valid_schema, ignore_extra_keys=ignore_extra_keys)
+            self._schema_errors = schema.SchemaError
         else:
+            # Nothing raises ``SchemaError`` without a schema
             self.schema = None
+            self._schema_errors = ()
 
-        self.use_os_keys = use_os_keys
-        self.extra_data = {}  # Settings not stored in a config file
+        # Report every schema error in a file at once, not just the first
+        self.collect_errors = collect_errors
 
-        self.load_configs()
+        # Check writes against the schema: every write to settings from the
+        # config files, and writes of other settings that the schema names
+        self.validate_writes = validate_writes
 
-    def __delitem__(self):
-        pass
+        # An optional ``schema.ValidationMemo``, for files that repeat the
+        # same sections many times
+        self.validation_memo = validation_memo
+
+        # OS-keyed mappings are resolved by the ``Overlay`` views, on lookup
+        self.use_os_keys = use_os_keys
+        self._paths = {}  # key -> {dotted path: value} for the key's tree
+        self.loader = loader
+        self.lazy = lazy
+
+        # Keep loaded data as ``FrozenDict``s and tuples, without ruamel's
+        # comments; the default text is parsed again for ``dump``.
+        self.compact = compact
+
+        # Settings not stored in a config file.  An ``Overlay`` rather than a
+        # dict, so that writes below a top-level key are seen too.
+        before_write = None
+        if validate_writes and self.schema:
+            before_write = self._check_extra_write
+        self.extra_data = Overlay(
+            on_change=self._on_change, before_write=before_write,
+            resolve=self._resolver())
+
+        # Override settings from ``<env_prefix>__SECTION__KEY`` environment
+        # variables and ``--section.key=value`` arguments; see ``yamiconfig.env``
+        self.env_prefix = env_prefix
+        self.argv = argv
+        self._override_map = None  # (default data, OverrideMap)
+
+        # Load the user files with this many threads; None loads them in turn
+        self.max_workers = max_workers
+
+        # An optional ``ConfigCache`` of parsed files
+        self.cache = cache
+        self._schema_key = None
+
+        self._emitter = None  # A round-trip ``YAML`` reused for writing
+
+        # Writers hold the lock and publish a new snapshot; readers don't lock
+        self._lock = threading.RLock()
+        self._snapshot = None
+
+        # Every top-level key, in order.  Like the other read-side caches,
+        # this is replaced rather than changed, so iterating it is safe.
+        self._keys = {}
+        self._views = (KeysView(self), ItemsView(self), ValuesView(self))
+
+        # A precompiled artifact (see ``compile``) that's used instead of
+        # parsing the config files, as long as none of them have changed.
+        self.artifact = artifact
+        if not (artifact and self.load_artifact(artifact)):
+            self.load_configs()
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __delitem__(self, key):
+        with self._lock:
+            if key in self.extra_data:
+                del self.extra_data[key]
+            else:
+                del self._calculated[key]
 
     def __getitem__(self, key):
-        value = self.extra_data[key] if (key in self.extra_data) else self._calculated[key]
-        return self._decode_os_value(value)
+        if self.stats is not None:
+            self.stats.record_read(key)
+        return self.extra_data[key] if (key in self.extra_data) else self._calculated[key]
 
     def __iter__(self):
-        return iter(self._calculated + self.extra_data)
+        return iter(self._keys)
 
     def __len__(self):
-        return len(self._calculated + self.extra_data)
+        return len(self._keys)
+
+    def keys(self):
+        return self._views[0]
+
+    def items(self):
+        return self._views[1]
+
+    def values(self):
+        return self._views[2]
 
     def __setitem__(self, key, value):
-        if key in self._default:
-            self._calculated[key] = value
+        with self._lock:
+            if key in self._default:
+                self._calculated[key] = value
+            else:
+                self.extra_data[key] = value
+
+    def _overlay(self, layers):
+        '''Return the ``Overlay`` that merges ``layers``'''
+        before_write = None
+        if self.validate_writes and self.schema:
+            before_write = self._check_write
+        return Overlay(
+            layers, on_change=self._on_change, before_write=before_write,
+            resolve=self._resolver())
+
+    def _resolver(self):
+        '''Return the ``resolve`` hook for the ``Overlay``s, if any'''
+        return _os_value if self.use_os_keys else None
+
+    def _raw_view(self, overlay=None):
+        '''
+        Return the merged settings (or another ``overlay``, such as
+        ``extra_data``) without OS keys resolved
+        '''
+        overlay = self._calculated if overlay is None else overlay
+        if overlay.resolve is None:
+            return overlay
+        return overlay.view(resolve=None, copy_values=False)
+
+    def _check_write(self, path, value):
+        '''
+        Validate a write of ``value`` to ``path`` against the schema.
+        Deletes are not checked.
+        '''
+        # Paths run through the OS keys, like the data the schema checks
+        if path[0] in self.extra_data:
+            data = self._raw_view(self.extra_data)
         else:
-            self.extra_data[key] = value
+            data = self._raw_view()
 
-    def _decode_os_value(self, value):
-        '''Return the value of a dictionary based on its keys'''
-        if not (self.use_os_keys and isinstance(value, dict)):
-            return value
+        try:
+            self._validate_path(data, path, value)
+        except self._schema_errors:
+            print("ERROR: Writing [%s] did not validate" % '.'.join(str(k) for k in path))
+            raise
+
+    def _check_extra_write(self, path, value):
+        '''
+        Validate a write to ``extra_data``, if the schema names its top-level
+        key (or can't tell; see ``_check_write``).
+        '''
+        compiled = self.schema.compile(self.stats, self.validation_memo)
+        node = compiled.item_schema(())
+        if (node is None) or (node.lookup(path[0]) is not None):
+            self._check_write(path, value)
+
+    def _validate_path(self, data, path, value):
+        '''
+        Validate ``value`` at ``path`` of the ``Overlay`` ``data``.
+
+        Only the item is validated, against the schema of the dict it belongs
+        to; that schema is looked up once per path.  When the path runs
+        through something other than plain dict schemas (such as an ``Or``),
+        the nearest enclosing item that has one is validated instead, with
+        the value applied to a copy of it.
 
-        # If the value keys consist only of 'windows', 'linux', and 'mac'
-        os_keys = ['windows', 'linux', 'mac']
-        if not [v_key for v_key in value.keys() if v_key not in os_keys]:
-            if IS_WIN:
-                return value['windows']
-            elif IS_MAC:
-                return value['mac']
+        :raises SchemaError: If it doesn't validate
+        '''
+        compiled = self.schema.compile(self.stats, self.validation_memo)
+
+        depth = len(path) - 1
+        while (depth >= 0) and (compiled.item_schema(path[:depth]) is None):
+            depth -= 1
+
+        if depth < len(path) - 1:
+            item = data
+            for part in path[:depth + 1]:
+                item = item[part]
+            item = item.to_dict()
+
+            node = item
+            for part in path[depth + 1:-1]:
+                node = node[part]
+            node[path[-1]] = value
+            value = item
+
+        if depth < 0:
+            # Not a dict schema at all
+            compiled.validate(value)
+        else:
+            compiled.validate_item(path[depth], value, parent=path[:depth])
+
+    def _on_change(self, path):
+        '''Called by the ``Overlay``s after every write, at any depth'''
+        self._publish(path[0])
+
+    def _publish(self, key=None):
+        '''
+        Publish a new snapshot after a write to the top-level ``key``, or
+        after everything changed.
+        '''
+        with self._lock:
+            if key is None:
+                previous = None
+                self._paths = {}
+
+                keys = dict.fromkeys(self._calculated)
+                keys.update(dict.fromkeys(self.extra_data))
+                self._keys = keys
             else:
-                return value['linux']
+                previous = self._snapshot
+                paths = dict(self._paths)
+                paths.pop(key, None)
+                self._paths = paths
+
+                present = (key in self.extra_data) or (key in self._calculated)
+                if present != (key in self._keys):
+                    keys = dict(self._keys)
+                    if present:
+                        keys[key] = None
+                    else:
+                        del keys[key]
+                    self._keys = keys
+
+            self._snapshot = self._calculated.freeze(
+                self.extra_data, self._decode_os_value, previous=previous,
+                key=key)
+
+    def _index_paths(self, key):
+        '''Return ``{dotted path: value}`` for ``key`` and everything below it'''
+        index = {}
+        stack = [(str(key), self[key])]
+        while stack:
+            path, value = stack.pop()
+            index[path] = value
+            if isinstance(value, Mapping):
+                stack.extend(
+                    ('%s.%s' % (path, k), v) for (k, v) in value.items())
+        return index
+
+    def get_path(self, path, default=_MISSING):
+        '''
+        Return a nested setting by its dotted path, e.g. ``'db.pool.size'``.
+
+        The first lookup below a top-level key indexes that key's whole tree,
+        so later lookups are a dict lookup.  A write to a top-level key (or
+        anything below it) drops its index.
 
+        :param str path: The dotted path
+        :param default: Returned if the path doesn't exist; otherwise a
+            ``KeyError`` is raised
+        '''
+        key = path.partition('.')[0]
+
+        paths = self._paths
+        index = paths.get(key)
+        if index is None:
+            if key not in self:
+                if default is _MISSING:
+                    raise KeyError(path)
+                return default
+            index = paths[key] = self._index_paths(key)
+
+        value = index.get(path, default)
+        if value is _MISSING:
+            raise KeyError(path)
         return value
 
+    def get_many(self, paths, default=_MISSING):
+        '''Return a list of the values of the dotted ``paths``'''
+        get_path = self.get_path
+        return [get_path(path, default) for path in paths]
+
+    def set_path(self, path, value):
+        '''
+        Set a nested setting by its dotted path, e.g. ``'db.pool.size'``.
+
+        Every key but the last one must already exist.
+        '''
+        keys = path.split('.')
+        with self._lock:
+            if len(keys) == 1:
+                self[path] = value
+                return
+
+            key = keys[0]
+            node = self.extra_data[key] if (key in self.extra_data) else self._calculated[key]
+            for key in keys[1:-1]:
+                node = node[key]
+            node[keys[-1]] = value
+
+    def snapshot(self):
+        '''
+        Return a frozen, hashable view of the current settings.
+
+        Snapshots are never modified: a reader holding one always sees a
+        single, consistent version, no matter what writers or reloads do in
+        the meantime.  This never takes a lock; each write publishes a new
+        snapshot by replacing a single reference.  (A list changed in place
+        isn't a write; it shows up in the next snapshot published.)
+        '''
+        return self._snapshot
+
+    def share(self, path, mode=0o644):
+        '''
+        Publish the current settings to ``path`` for other processes to read
+        with ``yamiconfig.shared.SharedConfig``.  Call this again after a
+        reload or writes; readers pick up the new version on ``refresh()``.
+
+        :param int mode: The permissions of the file; by default, processes
+            of any user may read it
+        :returns int: The version published
+        '''
+        from .shared import publish
+        return publish(self.snapshot(), path, mode=mode)
+
+    def _decode_os_value(self, value):
+        '''
+        Return the value with any (nested) dictionaries keyed by OS replaced
+        by their value for this platform.
+        '''
+        if not self.use_os_keys:
+            return value
+        return _resolve_os_keys(value)
+
     def _validate(self, yaml_data):
         '''
         Make sure the types of the data are the same types as the default.
         '''
         if self.schema:
-            self.schema.validate(yaml_data)
+            compiled = self.schema.compile(self.stats, self.validation_memo)
+            if self.collect_errors:
+                errors = compiled.validate_all(yaml_data)
+                if errors:
+                    from . import schema
+                    raise schema.SchemaErrorList(errors)
+            else:
+                compiled.validate(yaml_data)
 
     def reset(self, path=None):
         '''
@@ -117,50 +489,409 @@ class Configuration(collections.MutableMapping):
 
         :param str path: The path to the configuration file to write, if any
         '''
-        self._calculated = copy.deepcopy(self._default)
-        self.extra_data.clear()
+        with self._lock:
+            # The environment and ``argv`` overrides still apply
+            layers, paths = [self._default], [self.default_file]
+            if self._layer_paths[-1] is None:
+                layers.append(self._calculated.layers[-1])
+                paths.append(None)
+
+            self._calculated = self._overlay(layers)
+            self._layer_paths = paths
+            self.extra_data.clear()
+            self._publish()
 
         if path:
             self.store_config(path)
 
     def load_configs(self):
-        '''Find all of the config files and load them in'''
-        self._default = self.loads(self._default_raw)
-        self._calculated = copy.deepcopy(self._default)
+        '''
+        Find all of the config files and load them in.
 
-        for fpath in self.user_files:
-            temp = self.load_file(fpath)
-            if temp:
-                self._calculated.update(temp)
+        The default and user data are kept as separate layers of an
+        ``Overlay``; nested sections are merged on lookup, and writes never
+        touch the loaded data.
+        '''
+        self._install(self._load_layers())
 
-    def load_file(self, path):
-        '''Load and validate a file, and return the data.'''
-        if os.path.isfile(path):
-            with open(path) as fh:
-                text = fh.read()
+    def _load_layers(self):
+        '''Load the default and user data, without changing the settings'''
+        layers = [self._load_default(self._default_raw)]
+        layers.extend(self._load_user_files())
+        return layers
+
+    def _install(self, layers):
+        '''
+        Swap in new layers (default first); readers see all or none of it.
+        The environment and ``argv`` overrides are added on top.
+        '''
+        self._swap(self._prepare(layers))
+
+    def _prepare(self, layers):
+        '''
+        Return the settings of new layers (default first) for ``_swap``.  The
+        environment and ``argv`` overrides are added on top.  Nothing is
+        changed, so this can run in another thread.
+        '''
+        paths = [self.default_file] + list(self.user_files)
+        layers = [self._compact(layer) for layer in layers]
+        overrides = self._load_overrides(layers)
+        if overrides:
+            layers = list(layers) + [overrides]
+            paths.append(None)
+        return layers[0], self._overlay(layers), paths
+
+    def _swap(self, prepared):
+        '''Swap in settings from ``_prepare``, and publish them'''
+        with self._lock:
+            (self._default, self._calculated, self._layer_paths) = prepared
+            self._publish()
+
+    def _load_overrides(self, layers):
+        '''
+        Return the layer of environment and ``argv`` overrides of ``layers``
+        (default first), if any.  Each override is validated against the
+        schema, as if it were written to the merged ``layers``.
+        '''
+        if not (self.env_prefix or self.argv):
+            return None
+
+        from .env import OverrideMap, build_layer
+        default = layers[0]
+
+        # Variable names are only matched again if the default changes
+        if (self._override_map is None) or (self._override_map[0] is not default):
+            self._override_map = (default, OverrideMap(default, self.env_prefix))
+        names = self._override_map[1]
+
+        check = None
+        if self.schema:
+            merged = Overlay(layers, copy_values=False)
+
+            def check_override(path, value):
+                self._validate_path(merged, path, value)
+            check = check_override
+
+        found = names.from_environ(os.environ, check) if self.env_prefix else []
+        if self.argv:
+            found.extend(names.from_argv(self.argv, check))
+        return build_layer(found)
+
+    def compile(self, path):
+        '''
+        Write the loaded (and validated) config files to a binary artifact.
+
+        ``Configuration(artifact=path)`` loads the artifact instead of the
+        config files, as long as the files and schema are unchanged.
+
+        :param str path: The artifact to write
+        '''
+        layers = self._calculated.layers
+        write_artifact(path, fingerprint(self), layers[:1 + len(self.user_files)])
+
+    def load_artifact(self, path):
+        '''
+        Load the config files from an artifact written by ``compile``.
+
+        :param str path: The artifact
+        :returns bool: False if the artifact is missing, corrupt, or doesn't
+            match the config files and schema
+        '''
+        start = clock() if self.stats else 0
+        try:
+            layers = read_artifact(path, check=lambda header: is_fresh(header, self))
+        except ArtifactError:
+            return False
+
+        if self.stats:
+            self.stats.record_file(path, 'artifact', clock() - start)
+
+        self._install(layers)
+        return True
+
+    def _load_user_files(self):
+        '''
+        Load every user file, and return their data in declaration order.
+
+        With ``max_workers``, the files are read, parsed and validated by a
+        thread pool.  Every file is loaded even if one fails; the error of the
+        first failing file (in declaration order) is then raised.
+        '''
+        if (not self.max_workers) or (len(self.user_files) < 2):
+            return [self.load_file(path) or {} for path in self.user_files]
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [pool.submit(self.load_file, path) for path in self.user_files]
+
+        errors = [future.exception() for future in futures]
+        for error in errors:
+            if error is not None:
+                raise error
+
+        return [future.result() or {} for future in futures]
+
+    def reload_file(self, path):
+        '''
+        Re-load a single config file and swap it into the merged settings.
+
+        Only the keys that the old or new file contains are merged again.
+        Readers see either the old or the new settings, never a mix.
+
+        :param str path: ``default_file`` or one of ``user_files``
+        :returns bool: False if ``path`` is not part of the current settings
+        '''
+        if path not in self._layer_paths:
+            return False
+
+        index = self._layer_paths.index(path)
+        if index == 0:
+            raw = self._read(path)
+            data = self._load_default(raw)
+        else:
+            data = self.load_file(path) or {}
+        data = self._compact(data)
+
+        with self._lock:
+            if index == 0:
+                self._default_raw, self._default = raw, data
+            self._calculated = self._calculated.with_layer(index, data)
+            self._publish()
+        return True
+
+    @classmethod
+    def aload(cls, *args, **kwargs):
+        '''
+        Create a ``Configuration`` without blocking the asyncio event loop::
+
+            config = await Configuration.aload('default.yaml', user_config_files=[...])
+
+        See ``yamiconfig.aio.aload`` (Python 3 only).
+        '''
+        from .aio import aload
+        return aload(cls, *args, **kwargs)
+
+    def areload(self, executor=None):
+        '''
+        Reload the config files without blocking the asyncio event loop::
+
+            await config.areload()
+
+        See ``yamiconfig.aio.areload`` (Python 3 only).
+        '''
+        from .aio import areload
+        return areload(self, executor=executor)
+
+    def watch(self, interval=1.0, use_inotify=True, on_reload=None):
+        '''
+        Start watching the config files, and reload them when they change.
+
+        See ``yamiconfig.watch.ConfigWatcher`` for the arguments.
+
+        :returns: The started ``ConfigWatcher``; call ``stop()`` when done
+        '''
+        from .watch import ConfigWatcher
+
+        watcher = ConfigWatcher(
+            self, interval=interval, use_inotify=use_inotify,
+            on_reload=on_reload)
+        watcher.start()
+        return watcher
+
+    def _load_default(self, text):
+        '''
+        Load the default config text.
+
+        With ``lazy``, only the offsets of the top-level sections are found
+        here; each section is parsed and validated on first access.  Lazy
+        loading falls back to a full load for documents that can't be split
+        safely (see ``yamiconfig.lazy.index_sections``), and for schemas
+        whose top level isn't a plain dict schema (such as an ``And``), which
+        can only validate the whole document.
+        '''
+        if self.lazy and self._can_split():
+            sections = index_sections(text)
+            if sections is not None:
+                return LazySections(text, sections, self._load_section)
+
+        return self._parse(text, self.default_file or '<default>')
+
+    def _can_split(self):
+        '''Returns True if the schema can validate one section at a time'''
+        if not self.schema:
+            return True
+        compiled = self.schema.compile(self.stats, self.validation_memo)
+        return compiled.item_schema(()) is not None
+
+    def _load_section(self, key, text):
+        '''Parse and validate one top-level section of the default config'''
+        source = '%s[%s]' % (self.default_file or '<default>', key)
+        stats = self.stats
+
+        start = clock() if stats else 0
+        data = self._yaml().load(text) or {}
+        if list(data) != [key]:
+            raise ValueError("Could not load section %r of the default config" % key)
+
+        if stats:
+            stats.record_file(source, 'parse', clock() - start, nbytes=len(text))
+            start = clock()
+
+        if self.schema:
+            self.schema.compile(stats, self.validation_memo).validate_item(key, data[key])
+            if stats:
+                stats.record_file(source, 'validate', clock() - start)
+
+        return _compact_data(data[key]) if self.compact else data[key]
 
-            data = YAML().load(text) or {}
+    def _compact(self, layer):
+        '''Return a loaded layer in its runtime form; see ``compact``'''
+        if (not self.compact) or isinstance(layer, LazySections):
+            # Lazy sections are made compact as they're loaded
+            return layer
+        return _compact_data(layer)
 
+    def _stored_view(self):
+        '''
+        Return the merged settings as they're stored: without OS keys
+        resolved, or the environment and ``argv`` overrides.
+        '''
+        view = self._raw_view()
+        if self._layer_paths[-1] is None:
+            layers = list(view.layers)
+            layers[-1] = {}
+            view = view.view(layers, copy_values=False)
+        return view
+
+    def _write_back_view(self, view=None):
+        '''
+        Return the merged settings (by default, all of them) for writing back
+        to YAML.  With ``compact``, the default text is parsed again for its
+        comments.
+        '''
+        view = self._raw_view() if view is None else view
+        if not self.compact:
+            return view
+
+        from ruamel.yaml import YAML
+        documents = [d for d in YAML().load_all(self._default_raw) if d is not None]
+        tree = documents[0] if len(documents) == 1 else Overlay(documents)
+        layers = list(view.layers)
+        layers[0] = tree
+        return view.view(layers, copy_values=False)
+
+    def _read(self, path):
+        '''Return the text of ``path``'''
+        start = clock() if self.stats else 0
+        with open(path) as fh:
+            text = fh.read()
+        if self.stats:
+            self.stats.record_file(path, 'read', clock() - start, nbytes=len(text))
+        return text
+
+    def _parse(self, stream, source, nbytes=None):
+        '''
+        Parse and validate YAML text, or a stream of it.
+
+        Every document of a multi-document stream is validated as soon as it
+        is parsed; the documents are merged as layers of an ``Overlay``, later
+        documents taking precedence.
+
+        :param stream: A string, or a file-like object
+        :param str source: The file the text came from, for ``stats``
+        :param int nbytes: The size of ``stream``, for ``stats``, if it
+            wasn't recorded when it was read
+        '''
+        stats = self.stats
+        documents = self._yaml().load_all(stream)
+
+        layers = []
+        while True:
+            start = clock() if stats else 0
             try:
-                self._validate(data)
-            except SchemaError:
+                data = next(documents)
+            except StopIteration:
+                # Finding the end of the stream is parsing too
+                if stats:
+                    stats.record_file(
+                        source, 'parse', clock() - start, nbytes=nbytes,
+                        keys=sum(len(d) for d in layers))
+                break
+
+            if stats:
+                stats.record_file(source, 'parse', clock() - start)
+            if data is None:
+                continue
+
+            start = clock() if stats else 0
+            self._validate(data)
+            if stats and self.schema:
+                stats.record_file(source, 'validate', clock() - start)
+
+            layers.append(data)
+
+        if len(layers) > 1:
+            return Overlay(layers)
+        return layers[0] if layers else {}
+
+    def _parse_file(self, path):
+        '''
+        Parse and validate a file without reading it into memory first.
+        Large files are memory-mapped.
+        '''
+        with open(path, 'rb') as fh:
+            # The file is read while it's parsed, so that's all that's timed
+            size = os.fstat(fh.fileno()).st_size
+            if size < MMAP_THRESHOLD:
+                return self._parse(fh, path, size)
+
+            view = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                return self._parse(view, path, size)
+            finally:
+                view.close()
+
+    def load_file(self, path):
+        '''
+        Load and validate a file, and return the data.
+
+        The data of a file with several YAML documents is an ``Overlay`` of
+        them, later documents taking precedence.
+        '''
+        if os.path.isfile(path):
+            try:
+                if self.cache is not None:
+                    if self._schema_key is None:
+                        self._schema_key = '%s:%s' % (
+                            self.loader, schema_fingerprint(self.schema))
+
+                    start = clock() if self.stats else 0
+                    data = self.cache.load(
+                        path, lambda raw: self._parse(raw.decode('utf-8'), path),
+                        salt=self._schema_key)
+                    if self.stats:
+                        self.stats.record_file(path, 'cache', clock() - start)
+                    return data
+
+                return self._parse_file(path)
+            except self._schema_errors as e:
                 print("ERROR: Configuration file [%s] did not validate" % path)
+                e.config_file = path
                 raise
 
-            return data
-
         return None
 
+    def _yaml(self):
+        '''Return a YAML instance for the configured loader'''
+        from ruamel.yaml import YAML
+        if self.loader == 'fast':
+            return YAML(typ='safe', pure=False)
+        return YAML()
+
     def loads(self, yaml_string):
         '''Load a configuration from a string'''
-        data = YAML().load(yaml_string) or {}
-
-        try:
-            self._validate(data)
-        except SchemaError:
-            raise
-
-        return data
+        return self._parse(yaml_string, '<string>')
 
     def dump(self, obj=None):
         '''
@@ -168,39 +899,67 @@ class Configuration(collections.MutableMapping):
 
         NOTE: This only includes keys that are part of the default config.
         '''
-        obj = obj or self._calculated
+        obj = obj or self._write_back_view()
+        if isinstance(obj, Overlay):
+            obj = obj.materialize()
+
+        from ruamel.yaml.compat import StringIO
         d = StringIO()
-        YAML().dump(obj, d)
+        with self._lock:
+            self._yaml_emitter().dump(obj, d)
         return d.getvalue()
 
+    def _yaml_emitter(self):
+        '''Return the (cached) round-trip YAML instance used for writing'''
+        if self._emitter is None:
+            from ruamel.yaml import YAML
+            self._emitter = YAML()
+        return self._emitter
+
     def is_default(self, key):
         '''Returns True if the key has not been modified from the default'''
+        return self._is_default(self._raw_view(), key)
+
+    def _is_default(self, view, key):
         return bool(
-            (key in self._calculated) and
+            (key in view) and
             (key in self._default) and
-            (self._calculated[key] == self._default[key])
+            (view[key] == self._default[key])
         )
 
     def store_config(self, fpath):
-        '''Stores the current configuration to the YAML file'''
-        with open(fpath, 'wb') as fh:
-            fh.write(self.dump())
+        '''
+        Stores the settings that differ from the defaults to the YAML file.
+
+        Only top-level keys where ``is_default`` is False are written, so the
+        file can be used as a user config file.  Environment and ``argv``
+        overrides are not written.  The YAML is streamed to a temporary file,
+        which then replaces ``fpath``.
+        '''
+        from ruamel.yaml.comments import CommentedMap
+        with self._lock:
+            stored = self._stored_view()
+            view = None
+            obj = CommentedMap()
+            for key in stored:
+                if not self._is_default(stored, key):
+                    if view is None:
+                        view = self._write_back_view(stored)
+                    value = view[key]
+                    obj[key] = value.materialize() if isinstance(value, Overlay) else thaw(value)
+
+            with _atomic_open(fpath) as fh:
+                if obj:
+                    self._yaml_emitter().dump(obj, fh)
 
     def store_defaults(self, fpath):
         '''Creates a new file with all default settings commented out'''
-        if self.default_file:
-            default_text_lines = open(self.default_file).readlines()
-        else:
-            default_text_lines = self._default_raw.split('\n')
-
-        new_lines = [USER_CONFIG_HEADER]
-
-        # Comment out all of the lines
-        for line in default_text_lines:
-            line = line.strip()
-            if line and (not line.startswith('#')):
-                line = "# " + line
-            new_lines.append(line)
-
-        with open(fpath, 'wb') as fh:
-            fh.write('\n'.join(new_lines))
+        with _atomic_open(fpath) as fh:
+            fh.write(USER_CONFIG_HEADER.encode('utf-8'))
+
+            # Comment out all of the lines
+            for line in self._default_raw.split('\n'):
+                line = line.strip()
+                if line and (not line.startswith('#')):
+                    line = "# " + line
+                fh.write(('\n' + line).encode('utf-8'))
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# coding: utf-8
+'''
+Command-line tools.
+
+    yamiconfig compile --default default.yaml --user user.yaml \\
+        --schema myapp.config:SCHEMA --output config.yamic
+'''
+
+# Imports #####################################################################
+from __future__ import print_function
+import sys
+import argparse
+import importlib
+
+from . import Configuration, LOADERS
+
+
+# Metadata ####################################################################
+__author__ = 'Timothy McFadden'
+__creationDate__ = '17-OCT-2026'
+__license__ = 'MIT'
+
+
+def _import_schema(spec):
+    '''Return the object named by ``module:attribute``'''
+    module, _, name = spec.partition(':')
+    if not name:
+        raise ValueError("Schema must be given as `module:attribute`")
+    return getattr(importlib.import_module(module), name)
+
+
+def compile_command(args):
+    '''Load and validate the config files, and write the artifact'''
+    config = Configuration(
+        default_config_file=args.default,
+        user_config_files=args.user,
+        valid_schema=_import_schema(args.schema) if args.schema else None,
+        ignore_extra_keys=args.ignore_extra_keys,
+        loader=args.loader)
+    config.compile(args.output)
+    print("Wrote %s" % args.output)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='yamiconfig')
+    commands = parser.add_subparsers(dest='command')
+
+    compile_parser = commands.add_parser(
+        'compile', help='Write config files to a precompiled artifact')
+    compile_parser.add_argument('--default', required=True, help='The default config file')
+    compile_parser.add_argument(
+        '--user', action='append', default=[], help='A user config file (repeatable)')
+    compile_parser.add_argument('--schema', help='The schema, as `module:attribute`')
+    compile_parser.add_argument(
+        '--ignore-extra-keys', action='store_true', help='Passed to the schema')
+    compile_parser.add_argument('--loader', choices=LOADERS, default='roundtrip')
+    compile_parser.add_argument('--output', '-o', required=True, help='The artifact to write')
+    compile_parser.set_defaults(func=compile_command)
+
+    args = parser.parse_args(argv)
+    if not getattr(args, 'func', None):
+        parser.print_help()
+        return 2
+
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
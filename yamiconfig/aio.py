@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# coding: utf-8
+'''
+asyncio support for ``Configuration`` (Python 3 only).
+
+Reading, parsing and validating happen in an executor, so the event loop
+keeps running.  A reload swaps in the new settings in one step: handlers see
+the old settings until it is done, never a mix.
+'''
+
+# Imports #####################################################################
+import asyncio
+import functools
+
+
+# Metadata ####################################################################
+__author__ = 'Timothy McFadden'
+__creationDate__ = '17-OCT-2026'
+__license__ = 'MIT'
+
+
+# User files are loaded by this many threads, unless ``max_workers`` is given
+DEFAULT_WORKERS = 8
+
+# Python 3.6 has no ``get_running_loop``; in a coroutine, this does the same
+_running_loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)
+
+
+async def aload(cls, *args, executor=None, **kwargs):
+    '''
+    Create a ``Configuration`` (``cls``) in ``executor``.
+
+    Takes the same arguments as ``Configuration``; ``max_workers`` defaults to
+    ``DEFAULT_WORKERS`` so the user files are loaded concurrently.
+
+    :param executor: A ``concurrent.futures`` executor; None uses the loop's
+        default executor
+    '''
+    kwargs.setdefault('max_workers', DEFAULT_WORKERS)
+    loop = _running_loop()
+    return await loop.run_in_executor(executor, functools.partial(cls, *args, **kwargs))
+
+
+async def areload(config, executor=None):
+    '''
+    Reload ``config``'s files in ``executor``, then swap them in.
+
+    Like ``Configuration.load_configs``, this drops runtime changes.  If any
+    file fails to load, the current settings are kept and the error raised.
+    Only the swap itself runs on the event loop.
+    '''
+    def load():
+        return config._prepare(config._load_layers())
+
+    loop = _running_loop()
+    prepared = await loop.run_in_executor(executor, load)
+    config._swap(prepared)
+    return config
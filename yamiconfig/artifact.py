@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+# coding: utf-8
+'''
+Precompiled configuration artifacts.
+
+An artifact holds the parsed, validated data of every config file, plus a
+fingerprint of the files, schema and YAML loader it was built from.  Loading a fresh
+artifact skips YAML parsing and schema validation entirely.
+
+Layout: ``MAGIC``, one format byte (``m`` for marshal, ``p`` for pickle), a
+4-byte header length, the marshalled header, then the payload.
+'''
+
+# Imports #####################################################################
+import os
+import sys
+import mmap
+import struct
+import marshal
+import hashlib
+from contextlib import contextmanager
+
+from .cache import file_stat, read_bytes, schema_fingerprint
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # Python 2
+    from collections import Mapping
+
+
+# Metadata ####################################################################
+__author__ = 'Timothy McFadden'
+__creationDate__ = '17-OCT-2026'
+__license__ = 'MIT'
+
+
+MAGIC = b'YAMIC\x01'
+_LENGTH = struct.Struct('<I')
+_replace = getattr(os, 'replace', os.rename)
+
+try:
+    _TEXT = (str, unicode)  # noqa: F821
+except NameError:
+    _TEXT = (str,)
+
+_LOADERS = {}  # loader name -> ``loader_fingerprint``, once per process
+
+
+class ArtifactError(Exception):
+    '''The artifact is missing, corrupt, or out of date'''
+    pass
+
+
+def _plain(value):
+    '''Return ``value`` as built-in types only (for ``marshal``)'''
+    if isinstance(value, Mapping):
+        return dict((_plain(k), _plain(v)) for (k, v) in value.items())
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, bool):
+        return bool(value)
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, float):
+        return float(value)
+    if isinstance(value, _TEXT):
+        return type(value)(value) if type(value) in _TEXT else str(value)
+    return value
+
+
+def source_fingerprint(path):
+    '''Return ``[path, mtime_ns, size, sha1]`` for a source file'''
+    path = os.path.abspath(path)
+    if not os.path.isfile(path):
+        return [path, None, None, None]
+    mtime_ns, size = file_stat(path)
+    return [path, mtime_ns, size, hashlib.sha1(read_bytes(path)).hexdigest()]
+
+
+def _installed(module, path):
+    '''
+    Return ``[path, mtime_ns, size]`` of the file that ``import module``
+    would load (``path`` below a ``sys.path`` entry), without importing it;
+    or None if it isn't installed.
+    '''
+    loaded = sys.modules.get(module)
+    if loaded is not None:
+        found = getattr(loaded, '__file__', None)
+    else:
+        found = next((
+            os.path.join(entry, path) for entry in sys.path
+            if os.path.isfile(os.path.join(entry or '.', path))), None)
+    if found is None:
+        return None
+    found = os.path.abspath(found)
+    return [found] + list(file_stat(found))
+
+
+def loader_fingerprint(loader):
+    '''
+    Return ``[name, ruamel.yaml, libyaml]`` for a ``Configuration`` loader:
+    its name, and the installed ``ruamel.yaml`` package and its C extension
+    (see ``_installed``), since upgrading either can change what is parsed.
+    '''
+    found = _LOADERS.get(loader)
+    if found is None:
+        extension = None
+        try:
+            import importlib.util
+            spec = importlib.util.find_spec('_ruamel_yaml')
+            if (spec is not None) and spec.origin:
+                extension = [spec.origin] + list(file_stat(spec.origin))
+        except ImportError:  # Python 2
+            import imp
+            try:
+                extension = imp.find_module('_ruamel_yaml')[1]
+                extension = [extension] + list(file_stat(extension))
+            except ImportError:
+                pass
+
+        found = _LOADERS[loader] = [
+            loader,
+            _installed('ruamel.yaml', os.path.join('ruamel', 'yaml', '__init__.py')),
+            extension,
+        ]
+    return found
+
+
+def fingerprint(config):
+    '''Return the fingerprint of a ``Configuration``'s sources and schema'''
+    if config.default_file:
+        files = [source_fingerprint(config.default_file)]
+    else:
+        files = [['<text>', None, None, hashlib.sha1(
+            config._default_raw.encode('utf-8')).hexdigest()]]
+    files.extend(source_fingerprint(path) for path in config.user_files)
+
+    return {
+        'files': files,
+        'schema': schema_fingerprint(config.schema),
+        'loader': loader_fingerprint(config.loader),
+    }
+
+
+def is_fresh(header, config):
+    '''
+    Return True if an artifact ``header`` matches ``config``'s sources.
+
+    Files are only hashed when their stat differs from the recorded one.
+    '''
+    expected = header.get('files', [])
+    if len(expected) != 1 + len(config.user_files):
+        return False
+    if header.get('schema') != schema_fingerprint(config.schema):
+        return False
+    if header.get('loader') != loader_fingerprint(config.loader):
+        return False
+
+    if config.default_file:
+        paths = [config.default_file] + list(config.user_files)
+    else:
+        paths = [None] + list(config.user_files)
+        if expected[0][3] != hashlib.sha1(config._default_raw.encode('utf-8')).hexdigest():
+            return False
+
+    for path, recorded in zip(paths, expected):
+        if path is None:
+            continue
+        path = os.path.abspath(path)
+        if path != recorded[0]:
+            return False
+        if not os.path.isfile(path):
+            if recorded[3] is not None:
+                return False
+            continue
+        if list(file_stat(path)) != recorded[1:3]:
+            if source_fingerprint(path)[3] != recorded[3]:
+                return False
+    return True
+
+
+@contextmanager
+def _atomic_open(path, mode=None):
+    '''
+    Open a temporary file (in binary mode) next to ``path``, and move it over
+    ``path`` once the block finishes.  ``path`` is untouched if it fails.
+
+    The file gets ``mode``, or else keeps the permissions of the one it
+    replaces (a new one gets the umask's).  A symlink is followed, so that
+    its target is replaced.
+    '''
+    import tempfile
+    path = os.path.realpath(path)
+    if mode is None:
+        try:
+            mode = os.stat(path).st_mode & 0o7777
+        except OSError:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+
+    fd, temp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            yield fh
+        os.chmod(temp, mode)
+        _replace(temp, path)
+    except BaseException:
+        os.remove(temp)
+        raise
+
+
+def write_artifact(path, header, layers):
+    '''Write ``layers`` (a list of mappings) to an artifact, atomically'''
+    layers = [_plain(layer) for layer in layers]
+    try:
+        fmt, payload = b'm', marshal.dumps(layers)
+    except ValueError:
+        # Something marshal doesn't support, such as a datetime
+        import pickle
+        fmt, payload = b'p', pickle.dumps(layers, pickle.HIGHEST_PROTOCOL)
+
+    header = marshal.dumps(header)
+    with _atomic_open(path) as fh:
+        fh.write(MAGIC + fmt + _LENGTH.pack(len(header)))
+        fh.write(header)
+        fh.write(payload)
+
+
+def read_artifact(path, check=None):
+    '''
+    Return the layers stored in an artifact.
+
+    :param check: Called with the header before the payload is decoded;
+        returns False if the artifact can't be used
+    :raises ArtifactError: If the artifact is missing, corrupt or rejected
+    '''
+    try:
+        fh = open(path, 'rb')
+    except (IOError, OSError) as e:
+        raise ArtifactError('Could not open %s: %s' % (path, e))
+
+    with fh:
+        try:
+            view = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            raise ArtifactError('%s is empty' % path)
+
+        try:
+            start = len(MAGIC) + 1 + _LENGTH.size
+            if view[:len(MAGIC)] != MAGIC:
+                raise ArtifactError('%s is not a yamiconfig artifact' % path)
+            fmt = view[len(MAGIC):len(MAGIC) + 1]
+            (length,) = _LENGTH.unpack(view[len(MAGIC) + 1:start])
+            header = marshal.loads(view[start:start + length])
+            if (check is not None) and not check(header):
+                raise ArtifactError('%s is out of date' % path)
+
+            payload = view[start + length:]
+            if fmt == b'm':
+                return marshal.loads(payload)
+            import pickle
+            return pickle.loads(payload)
+        except (EOFError, ValueError, TypeError, struct.error) as e:
+            raise ArtifactError('%s is corrupt: %s' % (path, e))
+        finally:
+            view.close()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+# coding: utf-8
+'''
+A cache of parsed and validated configuration files.
+
+Entries are keyed on the file's path, modification time, size and content
+hash, so a file is only parsed again after it actually changes.
+'''
+
+# Imports #####################################################################
+import os
+import re
+import hashlib
+import functools
+import threading
+from collections import OrderedDict
+
+
+# Metadata ####################################################################
+__author__ = 'Timothy McFadden'
+__creationDate__ = '17-OCT-2026'
+__license__ = 'MIT'
+
+
+# ``os.replace`` is atomic on every platform, but missing on Python 2
+_replace = getattr(os, 'replace', os.rename)
+
+# Object addresses make ``repr`` differ between processes
+_ADDRESS_RE = re.compile(r' at 0x[0-9a-fA-F]+')
+
+# Schema attributes that only cache what the others describe
+_CACHED = frozenset(['_compiled', '_compiled_stats', '_dispatch', '_pattern'])
+
+
+def _describe(obj, out, active):
+    '''
+    Append text that identifies ``obj`` to ``out``.  Functions are described
+    by their name and code (with their constants, defaults and closures), so
+    schemas that differ only in a ``lambda`` or ``Use`` callable differ.
+
+    :param set active: The ids of the containers being described, to stop
+        at cycles
+    '''
+    if id(obj) in active:
+        out.append('<cycle>')
+        return
+    active.add(id(obj))
+    try:
+        _describe_one(obj, out, active)
+    finally:
+        active.discard(id(obj))
+
+
+def _describe_one(obj, out, active):
+    if isinstance(obj, dict):
+        items = []
+        for key, value in obj.items():
+            key_text, value_text = [], []
+            _describe(key, key_text, active)
+            _describe(value, value_text, active)
+            items.append('%s:%s' % (''.join(key_text), ''.join(value_text)))
+        out.append('{%s}' % ','.join(sorted(items)))
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        items = []
+        for value in obj:
+            text = []
+            _describe(value, text, active)
+            items.append(''.join(text))
+        if isinstance(obj, (set, frozenset)):
+            items.sort()
+        out.append('%s(%s)' % (type(obj).__name__, ','.join(items)))
+    elif isinstance(obj, type):
+        out.append('%s.%s' % (obj.__module__, getattr(obj, '__qualname__', obj.__name__)))
+    elif hasattr(obj, '__code__'):
+        # A function or lambda
+        code = obj.__code__
+        out.append('%s.%s:%s' % (
+            obj.__module__, getattr(obj, '__qualname__', obj.__name__),
+            hashlib.sha1(code.co_code).hexdigest()))
+        cells = tuple(cell.cell_contents for cell in (obj.__closure__ or ()))
+        _describe((code.co_consts, code.co_names, obj.__defaults__, cells), out, active)
+    elif hasattr(obj, '__func__') and hasattr(obj, '__self__'):
+        # A bound method
+        _describe((obj.__func__, obj.__self__), out, active)
+    elif isinstance(obj, functools.partial):
+        _describe((obj.func, obj.args, obj.keywords), out, active)
+    elif hasattr(obj, '__dict__') and not isinstance(obj, type(os)):
+        attrs = dict(
+            (name, value) for (name, value) in vars(obj).items()
+            if name not in _CACHED)
+        out.append('%s.%s' % (type(obj).__module__, type(obj).__name__))
+        _describe(attrs, out, active)
+    else:
+        out.append(_ADDRESS_RE.sub('', repr(obj)))
+
+
+def schema_fingerprint(schema):
+    '''Return a string that identifies ``schema`` across processes.'''
+    if schema is None:
+        return ''
+    out = []
+    _describe(schema, out, set())
+    return hashlib.sha1(''.join(out).encode('utf-8')).hexdigest()
+
+
+def file_stat(path):
+    '''Return ``(mtime_ns, size)`` of ``path``.'''
+    st = os.stat(path)
+    mtime_ns = getattr(st, 'st_mtime_ns', None)
+    if mtime_ns is None:
+        mtime_ns = int(st.st_mtime * 1e9)
+    return (mtime_ns, st.st_size)
+
+
+def read_bytes(path):
+    with open(path, 'rb') as fh:
+        return fh.read()
+
+
+class ConfigCache(object):
+    '''
+    An LRU cache of parsed configuration files.
+
+    Parsed data is stored pickled, so every hit returns a fresh copy that the
+    caller is free to modify.
+
+    :param int max_entries: The maximum number of files kept in memory
+    :param int max_bytes: The maximum size of the pickled data kept in memory
+    :param str cache_dir: If given, entries are also written to this
+        directory so they survive between processes
+    '''
+    def __init__(self, max_entries=128, max_bytes=64 * 1024 * 1024, cache_dir=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        self._size = 0
+        self._digests = {}  # path -> ((mtime_ns, size), sha1)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        '''Drop every in-memory entry'''
+        with self._lock:
+            self._entries.clear()
+            self._digests.clear()
+            self._size = 0
+
+    def load(self, path, parse, salt=''):
+        '''
+        Return the parsed data for ``path``.
+
+        :param str path: The file to load
+        :param parse: Called with the file's bytes on a cache miss; returns
+            the (validated) data to cache
+        :param str salt: Anything else the parsed result depends on, such as
+            a :func:`schema_fingerprint`
+        '''
+        import pickle
+        path = os.path.abspath(path)
+        stat = file_stat(path)
+
+        # The content hash is only recomputed when the file's stat changes
+        raw = None
+        known = self._digests.get(path)
+        if known and known[0] == stat:
+            digest = known[1]
+        else:
+            raw = read_bytes(path)
+            digest = hashlib.sha1(raw).hexdigest()
+            self._digests[path] = (stat, digest)
+
+        key = (path, stat[0], stat[1], digest, salt)
+        blob = self._get(key)
+        if blob is not None:
+            return pickle.loads(blob)
+
+        if raw is None:
+            raw = read_bytes(path)
+        data = parse(raw)
+        self._put(key, pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+        return data
+
+    def _disk_path(self, key):
+        name = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, name + '.pickle')
+
+    def _get(self, key):
+        with self._lock:
+            blob = self._entries.pop(key, None)
+            if blob is not None:
+                self._entries[key] = blob
+                return blob
+
+        if self.cache_dir:
+            try:
+                blob = read_bytes(self._disk_path(key))
+            except (IOError, OSError):
+                return None
+            self._remember(key, blob)
+            return blob
+
+        return None
+
+    def _put(self, key, blob):
+        self._remember(key, blob)
+
+        if self.cache_dir:
+            try:
+                os.makedirs(self.cache_dir)
+            except OSError:
+                # Already there, possibly made by another thread
+                if not os.path.isdir(self.cache_dir):
+                    raise
+            import tempfile
+            fd, temp = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as fh:
+                fh.write(blob)
+            _replace(temp, self._disk_path(key))
+
+    def _remember(self, key, blob):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = blob
+            self._size += len(blob)
+
+            while self._entries and (
+                (len(self._entries) > self.max_entries) or
+                (self._size > self.max_bytes)
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+# coding: utf-8
+'''
+Override settings from environment variables and command-line arguments.
+
+Every leaf setting of the default config gets a variable name and a dotted
+path, e.g. ``db.pool.size`` is ``APP__DB__POOL_SIZE`` for the prefix ``APP``.
+Names are matched against the default config as they're seen, and
+remembered per default config, so applying overrides again costs a dict
+lookup per variable (or argument).  Overrides are checked against the
+schema, like any other setting.
+'''
+
+# Imports #####################################################################
+from __future__ import print_function
+import re
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # Python 2
+    from collections import Mapping
+
+
+# Metadata ####################################################################
+__author__ = 'Timothy McFadden'
+__creationDate__ = '17-OCT-2026'
+__license__ = 'MIT'
+
+
+SEPARATOR = '__'
+
+_TRUE = frozenset(['1', 'true', 'yes', 'on', 'y'])
+_FALSE = frozenset(['0', 'false', 'no', 'off', 'n', ''])
+
+_NAME_RE = re.compile(r'\W')
+_MISSING = object()
+
+# Schemas that turn text into the type of a default value; built on first use
+_COERCE = []
+
+try:
+    _TEXT = (str, unicode)  # noqa: F821
+except NameError:
+    _TEXT = (str,)
+
+
+def leaf_paths(data, path=()):
+    '''Yield ``(path tuple, value)`` for every leaf of a mapping'''
+    for key, value in data.items():
+        if isinstance(value, Mapping) and value:
+            for item in leaf_paths(value, path + (key,)):
+                yield item
+        else:
+            yield path + (key,), value
+
+
+def env_name(prefix, path):
+    '''Return the environment variable for a path, e.g. ``APP__DB__POOL_SIZE``'''
+    parts = [_NAME_RE.sub('_', str(key)).upper() for key in path]
+    return SEPARATOR.join([prefix] + parts)
+
+
+class OverrideMap(object):
+    '''
+    Finds the settings named by environment variables and ``--dotted.path``
+    arguments.
+
+    Names are matched a level at a time, so only the sections that a
+    variable or argument names are read (a lazily-loaded default config
+    parses nothing else).  The names of each level, and every name looked
+    up, are remembered.
+
+    :param default: The default config data
+    :param str prefix: The environment variable prefix, e.g. ``APP``
+    '''
+    def __init__(self, default, prefix=None):
+        self.default = default
+        self.prefix = prefix
+        self._levels = {}  # (kind, path) -> {name part: key}
+        self._found = {}  # (kind, name) -> (path, default value) or None
+
+    def _names(self, kind, path, node):
+        '''Return ``{name part: key}`` for the keys of ``node``'''
+        names = self._levels.get((kind, path))
+        if names is None:
+            names = self._levels[(kind, path)] = {}
+            for key in node:
+                if kind == 'env':
+                    part = _NAME_RE.sub('_', str(key)).upper()
+                else:
+                    part = str(key)
+                names.setdefault(part, key)
+        return names
+
+    def _walk(self, kind, name, separator, node, path=()):
+        '''Return ``(path, default value)`` of the leaf that ``name`` names'''
+        names = self._names(kind, path, node)
+        # A key may itself contain the separator, so try every split
+        end = name.find(separator)
+        while True:
+            key = names.get(name if end < 0 else name[:end], _MISSING)
+            if key is not _MISSING:
+                value = node[key]
+                is_section = isinstance(value, Mapping) and value
+                if (end < 0) and not is_section:
+                    return path + (key,), value
+                if (end >= 0) and is_section:
+                    found = self._walk(
+                        kind, name[end + len(separator):], separator, value, path + (key,))
+                    if found is not None:
+                        return found
+            if end < 0:
+                return None
+            end = name.find(separator, end + 1)
+
+    def find(self, kind, name):
+        '''
+        Return ``(path, default value)`` for the leaf setting that ``name``
+        overrides, or None.
+
+        :param str kind: ``'env'`` for a variable name, or ``'argv'`` for a
+            dotted path
+        '''
+        found = self._found.get((kind, name), _MISSING)
+        if found is _MISSING:
+            found = None
+            start = (self.prefix or '') + SEPARATOR
+            if kind == 'env':
+                if self.prefix and name.startswith(start):
+                    found = self._walk(kind, name[len(start):], SEPARATOR, self.default)
+            elif name:
+                found = self._walk(kind, name, '.', self.default)
+            self._found[(kind, name)] = found
+        return found
+
+    def from_environ(self, environ, check=None):
+        '''
+        Return ``[(name, path, coerced value)]`` for ``environ``'s overrides.
+
+        :param check: Called with the path and coerced value of every
+            override; raises ``SchemaError`` to reject it
+        '''
+        if not self.prefix:
+            return []
+        start = self.prefix + SEPARATOR
+        found = []
+        for name, text in environ.items():
+            if name.startswith(start):
+                target = self.find('env', name)
+                if target is not None:
+                    found.append(_override(name, target, text, check))
+        return found
+
+    def from_argv(self, argv, check=None):
+        '''
+        Return ``[(argument, path, coerced value)]`` for every
+        ``--dotted.path=value`` argument naming a setting.  Other arguments
+        are ignored.
+
+        :param check: As for ``from_environ``
+        '''
+        found = []
+        for arg in argv:
+            if not arg.startswith('--'):
+                continue
+            (name, equals, text) = arg[2:].partition('=')
+            if equals:
+                target = self.find('argv', name)
+                if target is not None:
+                    found.append(_override(arg, target, text, check))
+        return found
+
+
+def _coercers():
+    if not _COERCE:
+        from .schema import Schema, Use
+        _COERCE.extend([
+            (int, Schema(Use(int)).compile()),
+            (float, Schema(Use(float)).compile()),
+        ])
+    return _COERCE
+
+
+def _override(source, target, text, check=None):
+    '''Return ``(source, path, value)`` for an override of ``target``'''
+    from .schema import SchemaError
+    try:
+        value = coerce(text, target[1])
+        if check is not None:
+            check(target[0], value)
+        return (source, target[0], value)
+    except SchemaError as e:
+        print("ERROR: Override [%s] did not validate" % source)
+        e.config_file = source
+        raise
+
+
+def coerce(text, default):
+    '''
+    Convert override text to the type of the ``default`` value.
+
+    Lists, mappings and null defaults take YAML flow text, e.g. ``[1, 2]``.
+
+    :raises SchemaError: If the text can't be converted
+    '''
+    if isinstance(default, bool):
+        lowered = text.strip().lower()
+        if lowered in _TRUE:
+            return True
+        if lowered in _FALSE:
+            return False
+        from .schema import SchemaError
+        raise SchemaError('%r is not a boolean' % text, None)
+
+    for base, schema in _coercers():
+        if isinstance(default, base):
+            return schema.validate(text)
+
+    if isinstance(default, _TEXT):
+        return text
+
+    from ruamel.yaml import YAML
+    return YAML(typ='safe', pure=True).load(text)
+
+
+def build_layer(overrides):
+    '''Return the nested layer for ``[(source, path, value)]`` overrides'''
+    layer = {}
+    for _, path, value in overrides:
+        node = layer
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = value
+    return layer
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# coding: utf-8
+'''
+Immutable, hashable versions of the containers found in config data.
+
+``FrozenDict`` is also the compact representation of loaded config data (see
+``Configuration(compact=True)``): its values are a tuple, and maps with the
+same keys share one key index.
+'''
+
+# Imports #####################################################################
+import sys
+import weakref
+
+try:
+    from collections.abc import Mapping, Set
+except ImportError:  # Python 2
+    from collections import Mapping, Set
+
+
+# Metadata ####################################################################
+__author__ = 'Timothy McFadden'
+__creationDate__ = '17-OCT-2026'
+__license__ = 'MIT'
+
+
+_intern = getattr(sys, 'intern', None) or intern  # noqa: F821
+
+try:
+    _TEXT = (str, unicode)  # noqa: F821
+except NameError:
+    _TEXT = (str,)
+
+
+class _Shape(dict):
+    '''A key index, ``{key: position}``; a ``dict`` that can be weakly referenced'''
+    __slots__ = ('__weakref__',)
+
+
+# Key tuple -> index; shared by every ``FrozenDict`` with those keys, and
+# dropped once none of them is left
+_SHAPES = weakref.WeakValueDictionary()
+
+
+def _shape(keys):
+    '''Return the (shared) index for a tuple of keys'''
+    index = _SHAPES.get(keys)
+    if index is None:
+        index = _SHAPES.setdefault(keys, _Shape((k, i) for (i, k) in enumerate(keys)))
+    return index
+
+
+class FrozenDict(Mapping):
+    '''
+    A read-only, hashable ``dict``.
+
+    Values are kept in a tuple, and the key-to-position index is shared by
+    every ``FrozenDict`` with the same keys (in the same order).  String keys
+    are interned.
+    '''
+    __slots__ = ('_index', '_values', '_hash')
+
+    def __init__(self, *args, **kwargs):
+        data = dict(*args, **kwargs)
+        keys = tuple(_intern(k) if type(k) is str else k for k in data)
+        self._index = _shape(keys)
+        self._values = tuple(data[k] for k in keys)
+        self._hash = None
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, dict(self.items()))
+
+    def __getitem__(self, key):
+        return self._values[self._index[key]]
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(frozenset(self.items()))
+        return self._hash
+
+    def get(self, key, default=None):
+        position = self._index.get(key)
+        return default if position is None else self._values[position]
+
+
+def is_frozen(value):
+    '''Return True if ``value`` is already immutable all the way down'''
+    return isinstance(value, (FrozenDict, frozenset)) or getattr(value, 'frozen', False)
+
+
+def freeze(value):
+    '''Return an immutable copy of ``value``, reusing frozen subtrees'''
+    if is_frozen(value):
+        return value
+    if isinstance(value, Mapping):
+        return FrozenDict((k, freeze(v)) for (k, v) in value.items())
+    if isinstance(value, (list, tuple)):
+        frozen = tuple(freeze(v) for v in value)
+        if (type(value) is tuple) and all(a is b for (a, b) in zip(frozen, value)):
+            return value
+        return frozen
+    if isinstance(value, (set, Set)):
+        return frozenset(freeze(v) for v in value)
+    return value
+
+
+def compact(value):
+    '''
+    Return a ``FrozenDict``/tuple copy of loaded data, without the comment,
+    position and formatting data that ruamel attaches to what it loads.
+    '''
+    if isinstance(value, Mapping):
+        return FrozenDict((compact(k), compact(v)) for (k, v) in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(compact(v) for v in value)
+    if isinstance(value, bool):
+        return bool(value)
+    for base in (int, float) + _TEXT:
+        if isinstance(value, base):
+            return value if type(value) is base else base(value)
+    return value
+
+
+def thaw(value):
+    '''Return a ``dict``/``list`` copy of frozen data; other values as-is'''
+    if isinstance(value, FrozenDict):
+        return dict((k, thaw(v)) for (k, v) in value.items())
+    if isinstance(value, tuple):
+        return [thaw(v) for v in value]
+    return value
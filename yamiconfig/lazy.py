@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# coding: utf-8
+'''
+Parse the top-level sections of a YAML document on first access.
+
+The document is scanned once for lines that start a top-level key; each
+section's text is only parsed (and validated) when the key is looked up.
+'''
+
+# Imports #####################################################################
+import re
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # Python 2
+    from collections import Mapping
+
+
+# Metadata ####################################################################
+__author__ = 'Timothy McFadden'
+__creationDate__ = '17-OCT-2026'
+__license__ = 'MIT'
+
+
+_MISSING = object()
+
+# A line that starts a top-level ``key:`` (plain or simply-quoted keys only)
+_SECTION_RE = re.compile(
+    r'''^(?:(?P<plain>[A-Za-z_][\w\-. ]*?)|'(?P<single>[^'\n]*)'|"(?P<double>[^"\\\n]*)")'''
+    r'''[ \t]*:(?:[ \t\r]|$)''',
+    re.MULTILINE)
+
+# Plain keys that YAML wouldn't load as strings
+_IMPLICIT = frozenset([
+    'y', 'n', 'yes', 'no', 'on', 'off', 'true', 'false', 'null', '~'])
+
+# Things that tie sections together, or that this scanner doesn't understand
+_UNSAFE_RE = re.compile(r'''(?:^|[\s\[{,])[&*!][^\s]|^(?:---|\.\.\.|%)''', re.MULTILINE)
+
+
+def index_sections(text):
+    '''
+    Return ``{key: (start, end)}`` offsets of each top-level section of
+    ``text``, or None if the document can't safely be split.
+
+    Splitting is refused for documents with anchors, aliases, tags,
+    directives or document markers, and for anything at column 0 that isn't
+    a comment or a simple key.
+    '''
+    if _UNSAFE_RE.search(text):
+        return None
+
+    sections = {}
+    starts = []
+    for match in _SECTION_RE.finditer(text):
+        key = match.group('plain')
+        if key is None:
+            key = match.group('single')
+            if key is None:
+                key = match.group('double')
+        if (key in sections) or (key.lower() in _IMPLICIT):
+            return None
+        sections[key] = None
+        starts.append((match.start(), key))
+
+    # Every other line at column 0 must be blank or a comment
+    covered = set(start for (start, _) in starts)
+    offset = 0
+    for line in text.splitlines(True):
+        if line[:1] not in ('', ' ', '\t', '#', '\n', '\r') and (offset not in covered):
+            return None
+        offset += len(line)
+
+    if not starts:
+        return None
+
+    ends = [start for (start, _) in starts[1:]] + [len(text)]
+    return dict(
+        (key, (start, end)) for ((start, key), end) in zip(starts, ends))
+
+
+class LazySections(Mapping):
+    '''
+    A read-only mapping of a document's top-level sections, parsed on first
+    access.
+
+    :param str text: The document
+    :param dict sections: The result of ``index_sections(text)``
+    :param parse: Called with ``(key, section text)``; returns the value
+    '''
+    def __init__(self, text, sections, parse):
+        self._text = text
+        self._sections = sections
+        self._parse = parse
+        self._loaded = {}
+        self._order = sorted(sections, key=lambda k: sections[k][0])
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self._order)
+
+    def __getitem__(self, key):
+        value = self._loaded.get(key, _MISSING)
+        if value is _MISSING:
+            start, end = self._sections[key]
+            value = self._loaded[key] = self._parse(key, self._text[start:end])
+        return value
+
+    def __contains__(self, key):
+        return key in self._sections
+
+    def __iter__(self):
+        return iter(self._order)
+
+    def __len__(self):
+        return len(self._sections)
+
+    @property
+    def loaded(self):
+        '''The keys that have been parsed so far'''
+        return list(self._loaded)
@@ -0,0 +1,609 @@
+#!/usr/bin/env python
+# coding: utf-8
+'''
+A recursive, copy-on-write view over a stack of mappings.
+
+``Overlay`` behaves like ``collections.ChainMap``, except that nested
+mappings are merged too: looking up a key whose value is a mapping in more
+than one layer returns another ``Overlay`` over those values.  The layers are
+never modified; writes are kept in a separate tree of dicts that only holds
+the keys that were actually written.  Mutable values, such as lists, are
+copied to the writes the first time they're read, so changing one in place
+doesn't change the layer it came from.
+
+Nested views are ``OverlayDict`` objects, which are real ``dict``s as well.
+'''
+
+# Imports #####################################################################
+try:
+    from collections.abc import Mapping, MutableMapping, MutableSet
+except ImportError:  # Python 2
+    from collections import Mapping, MutableMapping, MutableSet
+
+from .frozen import FrozenDict, freeze, thaw
+
+# Metadata ####################################################################
+__author__ = 'Timothy McFadden'
+__creationDate__ = '17-OCT-2026'
+__license__ = 'MIT'
+
+
+_MISSING = object()
+_DELETED = object()  # Marks a key deleted from the layers below
+
+# Values that are copied to the writes when they're read from a layer
+_MUTABLE = (list, MutableSet)
+
+
+class _WriteLayer(dict):
+    '''Holds the writes made below a key, as opposed to a written value'''
+    # key -> the layer value that a written value is an unchanged copy of
+    originals = None
+
+
+class _Replaced(_WriteLayer):
+    '''A written mapping: writes that hide the layers below them'''
+    pass
+
+
+def _untracked(value):
+    '''
+    Return True if a written value holds something that can change without a
+    write, such as a list.
+    '''
+    if isinstance(value, _WriteLayer):
+        return any(_untracked(v) for v in value.values())
+    return (value is not _DELETED) and (freeze(value) is not value)
+
+
+def _forget_copies(writes, key):
+    '''
+    Drop the copies of layer values below ``writes[key]`` that haven't been
+    changed, so that they don't hide new layers.  Changed copies are kept
+    as writes.
+    '''
+    value = writes.get(key, _MISSING)
+    originals = writes.originals
+    if originals and (key in originals):
+        if value == originals.pop(key):
+            del writes[key]
+    elif type(value) is _WriteLayer:
+        for name in list(value):
+            _forget_copies(value, name)
+        if not value:
+            del writes[key]
+
+
+def _as_writes(value):
+    '''
+    Return a written mapping as a ``_Replaced`` tree, so that it's looked up
+    (and written to) through views like the loaded data.
+    '''
+    return _Replaced(
+        (k, _as_writes(v) if isinstance(v, Mapping) else v) for (k, v) in value.items())
+
+
+class Overlay(MutableMapping):
+    '''
+    A recursive ``ChainMap``.
+
+    :param list layers: The mappings to look through, lowest priority first
+    :param on_change: Called with the path (a tuple of keys) of every write,
+        including writes made through nested views
+    :param before_write: Called with the path and value of every assignment
+        before it's made; raise to reject it
+    :param resolve: Called with every value that's read (mappings being
+        views); returns the value to hand out instead.  Writes are made to
+        the data as it is, not to what ``resolve`` returns.
+    :param bool copy_values: Copy mutable values to the writes when they're
+        read; False for views that are only read internally
+    '''
+    frozen = False
+
+    def __init__(self, layers=(), on_change=None, _writes=None, _parent=None, _key=None,
+                 before_write=None, resolve=None, copy_values=True):
+        self._layers = tuple(layers)
+        self._parent = _parent
+        self._key = _key
+        self._children = {}  # key -> Overlay, for mapping values
+        self._resolved = {}  # key -> (value, resolved value), for other values
+        self.on_change = on_change
+        self.before_write = before_write
+        self.resolve = resolve
+        self.copy_values = copy_values
+
+        # Top-level keys with writes that ``_untracked`` (only kept at the root)
+        self._untracked = set() if (_parent is None) else None
+
+        if (_writes is None) and (_parent is None):
+            _writes = _WriteLayer()
+        self._writes = _writes  # Created on the first write for children
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.to_dict())
+
+    @property
+    def layers(self):
+        '''The underlying mappings, lowest priority first'''
+        return self._layers
+
+    def view(self, layers=None, resolve=_MISSING, copy_values=True):
+        '''
+        Return a new overlay over ``layers`` (by default, the same ones) that
+        shares this one's writes and hooks.  ``resolve`` replaces the hook of
+        that name; ``None`` gives a view of the data as it is.
+
+        A view over other layers must not copy values to the shared writes
+        (``copy_values=False``), unless it replaces this overlay.
+        '''
+        new = self.__class__(
+            self._layers if layers is None else layers, on_change=self.on_change,
+            _writes=self._writes, before_write=self.before_write,
+            resolve=self.resolve if resolve is _MISSING else resolve,
+            copy_values=copy_values)
+        new._untracked = self._untracked
+        return new
+
+    def with_layer(self, index, layer):
+        '''
+        Return a new overlay with ``layers[index]`` replaced by ``layer``.
+
+        Writes are shared with this overlay, and so are the merged views of
+        keys that neither the old nor the new layer contains.  Unchanged
+        copies of values from the old layer are dropped from the writes; the
+        new overlay replaces this one.
+        '''
+        layers = list(self._layers)
+        old = layers[index]
+        layers[index] = layer
+
+        new = self.view(layers)
+        touched = set(old)
+        touched.update(layer)
+        for key, child in self._children.items():
+            if key not in touched:
+                new._children[key] = child
+        for key in touched:
+            _forget_copies(self._writes, key)
+        return new
+
+    def _lookup(self, key):
+        '''
+        Return the (resolved) value of ``key`` or ``_MISSING``.  Values other
+        than mappings are resolved once, until ``key`` is written.
+        '''
+        value = self._merged(key)
+        if (self.resolve is None) or (value is _MISSING):
+            return value
+        if isinstance(value, Mapping):
+            return self.resolve(value)
+
+        cached = self._resolved.get(key)
+        if (cached is not None) and (cached[0] is value):
+            return cached[1]
+        resolved = self.resolve(value)
+        self._resolved[key] = (value, resolved)
+        return resolved
+
+    def _merged(self, key):
+        '''Return the merged value of ``key`` or ``_MISSING``'''
+        written = _MISSING
+        if self._writes is not None:
+            written = self._writes.get(key, _MISSING)
+            if written is _DELETED:
+                return _MISSING
+            if (written is not _MISSING) and not isinstance(written, _WriteLayer):
+                if self.copy_values or not self._is_copy(key, written):
+                    return written
+                # Look through to this view's layers
+                written = _MISSING
+
+        child = self._children.get(key)
+        if child is not None:
+            return child
+
+        mappings = []
+        layers = () if type(written) is _Replaced else self._layers
+        for layer in reversed(layers):
+            value = layer.get(key, _MISSING)
+            if value is _MISSING:
+                continue
+            if isinstance(value, Mapping):
+                mappings.append(value)
+                continue
+            if not (mappings or (written is not _MISSING)):
+                if self.copy_values and isinstance(value, _MUTABLE):
+                    value = self._copy(key, value)
+                return value
+            break
+
+        if not mappings and (written is _MISSING):
+            return _MISSING
+
+        mappings.reverse()
+        child = self._child(mappings, None if written is _MISSING else written, key)
+        self._children[key] = child
+        return child
+
+    def _copy(self, key, value):
+        '''
+        Return a copy of the mutable layer ``value`` of ``key``, kept with
+        the writes so that changes made to it are seen.
+        '''
+        writes = self._write_layer()
+        copy = thaw(freeze(value))
+        if writes.setdefault(key, copy) is not copy:
+            # Another thread got there first
+            return writes[key]
+
+        if writes.originals is None:
+            writes.originals = {}
+        writes.originals[key] = value
+        root, path = self._root(key)
+        root._untracked.add(path[0])
+        return copy
+
+    def _is_copy(self, key, written):
+        '''Returns True if ``written`` is an unchanged copy of a layer value'''
+        originals = self._writes.originals
+        return bool(originals) and (key in originals) and (written == originals[key])
+
+    def _child(self, layers, writes, key):
+        '''Return a new view of the mapping ``key`` in ``layers``'''
+        return OverlayDict(
+            layers, _writes=writes, _parent=self, _key=key, resolve=self.resolve,
+            copy_values=self.copy_values)
+
+    def _refresh(self, key):
+        '''Called after ``key`` is written or deleted'''
+        pass
+
+    def _write_layer(self):
+        '''Return the dict that holds writes to this level'''
+        if self._writes is None:
+            parent_writes = self._parent._write_layer()
+            writes = parent_writes.get(self._key)
+            if not isinstance(writes, _WriteLayer):
+                writes = parent_writes[self._key] = _WriteLayer()
+            self._writes = writes
+        return self._writes
+
+    def _root(self, key):
+        '''Return the root overlay, and the path of ``key`` from it'''
+        path = [key]
+        node = self
+        while node._parent is not None:
+            path.append(node._key)
+            node = node._parent
+        return node, tuple(reversed(path))
+
+    def _changed(self, key):
+        '''Report a write of ``key`` to the root's ``on_change``'''
+        root, path = self._root(key)
+        if root.on_change is not None:
+            root.on_change(path)
+
+    def _detach(self, key):
+        '''Forget the child view of ``key``; its writes no longer apply'''
+        child = self._children.pop(key, None)
+        if child is not None:
+            child._parent = None
+            child._writes = _WriteLayer()
+
+    def __getitem__(self, key):
+        value = self._lookup(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return _filled(value)
+
+    def get(self, key, default=None):
+        value = self._lookup(key)
+        return default if (value is _MISSING) else _filled(value)
+
+    def __contains__(self, key):
+        return self._lookup(key) is not _MISSING
+
+    def __setitem__(self, key, value):
+        root, path = self._root(key)
+        if root.before_write is not None:
+            root.before_write(path, value)
+
+        if isinstance(value, Mapping):
+            value = _as_writes(value)
+        if _untracked(value):
+            root._untracked.add(path[0])
+        writes = self._write_layer()
+        writes[key] = value
+        if writes.originals:
+            writes.originals.pop(key, None)
+        self._resolved.pop(key, None)
+        self._detach(key)
+        self._refresh(key)
+        self._changed(key)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+
+        writes = self._write_layer()
+        if any(key in layer for layer in self._layers):
+            writes[key] = _DELETED
+        else:
+            del writes[key]
+        if writes.originals:
+            writes.originals.pop(key, None)
+        self._resolved.pop(key, None)
+        self._detach(key)
+        self._refresh(key)
+        self._changed(key)
+
+    def __iter__(self):
+        seen = set()
+        writes = self._writes or {}
+        for mapping in self._layers + (writes,):
+            for key in mapping:
+                if key not in seen:
+                    seen.add(key)
+                    if writes.get(key) is not _DELETED:
+                        yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def to_dict(self):
+        '''Return the merged data as nested ``dict`` objects'''
+        result = {}
+        for key in self:
+            value = self[key]
+            if isinstance(value, Overlay):
+                value = value.to_dict()
+            result[key] = thaw(value)
+        return result
+
+    def materialize(self):
+        '''
+        Return the merged data as a deep copy of the lowest layer, updated
+        with every other layer.
+
+        Copying the lowest layer keeps its type, so a ruamel ``CommentedMap``
+        keeps its comments.  Frozen data comes back as dicts and lists.
+        '''
+        if not self._layers:
+            return self.to_dict()
+
+        base = self._layers[0]
+        if isinstance(base, FrozenDict):
+            result = thaw(base)
+        else:
+            if not isinstance(base, dict):
+                base = dict(base.items())
+            import copy
+            result = copy.deepcopy(base)
+        self._materialize_into(result)
+        return result
+
+    def _materialize_into(self, target):
+        for key in list(target):
+            if key not in self:
+                del target[key]
+
+        for key in self:
+            value = self[key]
+            current = target.get(key, _MISSING)
+            if isinstance(value, Overlay):
+                if isinstance(current, dict):
+                    value._materialize_into(current)
+                    continue
+                value = value.to_dict()
+            elif current == value:
+                # Keep what's there (and its comments)
+                continue
+            target[key] = thaw(value)
+
+    def freeze(self, extra=None, decode=None, previous=None, key=_MISSING):
+        '''
+        Return a read-only, hashable ``FrozenOverlay`` of the current data.
+
+        The layers are shared, not copied, so this only costs as much as the
+        writes made so far.  Given the ``previous`` snapshot of this overlay
+        and the one top-level ``key`` written since, only that key's writes
+        are copied; every write to a mapping is reported to ``on_change``, so
+        nothing else can have changed.  The exception is a written list (or
+        other mutable value) that may have been changed in place, so then
+        every write is copied again.
+
+        :param extra: Top-level values that replace the merged ones; an
+            ``Overlay`` or a dict
+        :param decode: Applied to every top-level value that is read
+        '''
+        extra = extra or {}
+        source = self._writes or _WriteLayer()
+
+        untracked = set(self._untracked)
+        untracked.update(getattr(extra, '_untracked', extra))
+        untracked.discard(key)
+
+        if (previous is not None) and (key is not _MISSING) and \
+                (previous._layers is self._layers) and not untracked:
+            writes = _WriteLayer(previous._writes)
+            writes.pop(key, None)
+            if key in extra:
+                writes[key] = freeze(extra[key])
+            elif key in source:
+                writes[key] = freeze_writes(source[key])
+        else:
+            writes = freeze_writes(source)
+            for name, value in extra.items():
+                writes[name] = freeze(value)
+
+        return FrozenOverlay(self._layers, _writes=writes, _decode=decode)
+
+
+class OverlayDict(Overlay, dict):
+    '''
+    A nested ``Overlay`` that is also a ``dict``, so that sections can be
+    used anywhere a ``dict`` is expected (``json.dumps``, ``isinstance``...).
+
+    The ``dict`` holds the merged items of this level; it's filled when the
+    view is handed out, and updated by every write made through the view.
+    Nested mappings are ``OverlayDict`` objects too, filled when they are
+    handed out in turn, so reading a key doesn't copy the whole section.
+    Copying or pickling one gives a plain ``dict``.
+    '''
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self)
+        Overlay.__init__(self, *args, **kwargs)
+        self._filled = False
+
+    def _fill(self):
+        '''Fill the ``dict`` with this level's items (nested views unfilled)'''
+        for key in Overlay.__iter__(self):
+            dict.__setitem__(self, key, self._lookup(key))
+        self._filled = True
+
+    def _fill_children(self):
+        '''Fill this level and its nested views, before they are iterated'''
+        if not self._filled:
+            self._fill()
+        for value in dict.values(self):
+            if isinstance(value, OverlayDict) and not value._filled:
+                value._fill()
+
+    def __getitem__(self, key):
+        if not self._filled:
+            self._fill()
+        return _filled(dict.__getitem__(self, key))
+
+    def get(self, key, default=None):
+        if not self._filled:
+            self._fill()
+        return _filled(dict.get(self, key, default))
+
+    def __contains__(self, key):
+        if not self._filled:
+            self._fill()
+        return dict.__contains__(self, key)
+
+    def __iter__(self):
+        if not self._filled:
+            self._fill()
+        return dict.__iter__(self)
+
+    def __len__(self):
+        if not self._filled:
+            self._fill()
+        return dict.__len__(self)
+
+    def __eq__(self, other):
+        if not self._filled:
+            self._fill()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        if not self._filled:
+            self._fill()
+        return dict.__ne__(self, other)
+
+    def __repr__(self):
+        if not self._filled:
+            self._fill()
+        return dict.__repr__(self)
+
+    def keys(self):
+        if not self._filled:
+            self._fill()
+        return dict.keys(self)
+
+    def items(self):
+        self._fill_children()
+        return dict.items(self)
+
+    def values(self):
+        self._fill_children()
+        return dict.values(self)
+
+    def copy(self):
+        return self.to_dict()
+
+    __hash__ = None
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __reduce__(self):
+        return (dict, (self.to_dict(),))
+
+    def _refresh(self, key):
+        if not self._filled:
+            return
+        value = self._lookup(key)
+        if value is _MISSING:
+            dict.pop(self, key, None)
+        else:
+            dict.__setitem__(self, key, value)
+
+
+def _filled(value):
+    '''Return ``value``, filled first if it's an ``OverlayDict``'''
+    if isinstance(value, OverlayDict) and not value._filled:
+        value._fill()
+    return value
+
+
+def freeze_writes(writes):
+    '''Return a copy of a write layer with every written value frozen'''
+    if not isinstance(writes, _WriteLayer):
+        return writes if writes is _DELETED else freeze(writes)
+    return type(writes)((k, freeze_writes(v)) for (k, v) in writes.items())
+
+
+class FrozenOverlay(Overlay):
+    '''
+    A read-only ``Overlay``; see ``Overlay.freeze``.
+
+    Values are frozen when they are read, so lists come back as tuples and
+    mappings as ``FrozenOverlay`` or ``FrozenDict`` objects.
+    '''
+    frozen = True
+
+    def __init__(self, layers=(), on_change=None, _writes=None, _parent=None,
+                 _key=None, _decode=None):
+        super(FrozenOverlay, self).__init__(
+            layers, _writes=_writes, _parent=_parent, _key=_key, copy_values=False)
+        self._decode = _decode
+        self._values = {}
+        self._hash = None
+
+    def _child(self, layers, writes, key):
+        return self.__class__(layers, _writes=writes, _parent=self, _key=key)
+
+    def _lookup(self, key):
+        value = self._values.get(key, _MISSING)
+        if value is _MISSING:
+            value = super(FrozenOverlay, self)._lookup(key)
+            if value is _MISSING:
+                return value
+            if self._decode is not None:
+                value = self._decode(value)
+            value = self._values[key] = freeze(value)
+        return value
+
+    def _write_layer(self):
+        raise TypeError('%s is read-only' % self.__class__.__name__)
+
+    def __setitem__(self, key, value):
+        self._write_layer()
+
+    def __delitem__(self, key):
+        self._write_layer()
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(frozenset((key, self[key]) for key in self))
+        return self._hash
+
+    def freeze(self, *args, **kwargs):
+        if args or kwargs:
+            return super(FrozenOverlay, self).freeze(*args, **kwargs)
+        return self
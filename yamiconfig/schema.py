@@ -4,15 +4,20 @@ obtained from config-files, forms, external services or command-line
 parsing, converted from JSON/YAML (or something else) to Python data-types."""
 
 import re
+import copy
+import itertools
+import threading
+from collections import OrderedDict
 
 __version__ = '0.6.6'
 __all__ = ['Schema',
            'And', 'Or', 'Regex', 'Optional', 'Use', 'Forbidden',
-           'SchemaError',
+           'CompiledSchema', 'ValidationMemo', 'SchemaError',
            'SchemaWrongKeyError',
            'SchemaMissingKeyError',
            'SchemaForbiddenKeyError',
-           'SchemaUnexpectedTypeError']
+           'SchemaUnexpectedTypeError',
+           'SchemaErrorList']
 
 
 class SchemaError(Exception):
@@ -68,6 +73,16 @@ class SchemaUnexpectedTypeError(SchemaError):
     pass
 
 
+class SchemaErrorList(SchemaError):
+    """Error raised with every error found by a collecting validation."""
+
+    def __init__(self, errors):
+        self.all_errors = errors
+        SchemaError.__init__(self, [
+            '%s: %s' % ('.'.join(str(k) for k in x.path) or '<root>', x.code)
+            for x in errors])
+
+
 class And(object):
     """
     Utility function to combine validation directives in AND Boolean fashion.
@@ -100,7 +115,28 @@ class And(object):
 
 class Or(And):
     """Utility function to combine validation directives in a OR Boolean
-    fashion."""
+    fashion.
+
+    Alternatives that can't possibly accept the data (by its type, its
+    value, or the value of a ``discriminator`` key of a dict) are skipped;
+    see :class:`_OrDispatch`.  The key is found automatically when dict
+    alternatives have a literal ``key: value`` item in common, or can be
+    named with ``discriminator='type'``.
+    """
+    def __init__(self, *args, **kw):
+        self._discriminator = kw.pop('discriminator', None)
+        super(Or, self).__init__(*args, **kw)
+        self._dispatch = None
+
+    def _dispatcher(self):
+        """Return the :class:`_OrDispatch` of the alternatives, or None."""
+        if self._dispatch is None:
+            dispatch = None
+            if self._schema is Schema:
+                dispatch = _OrDispatch(self._args, self._discriminator)
+            self._dispatch = dispatch if (dispatch and dispatch.useful) else False
+        return self._dispatch or None
+
     def validate(self, data):
         """
         Validate data using sub defined schema/expressions ensuring at least
@@ -108,6 +144,21 @@ class Or(And):
         :param data: data to be validated by provided schema.
         :return: return validated data if not validation
         """
+        dispatch = self._dispatcher()
+        if dispatch is not None:
+            indexes = dispatch.candidates(data)
+            x = SchemaError([], [])
+            for index in indexes:
+                s = self._schema(self._args[index], error=self._error,
+                                 ignore_extra_keys=self._ignore_extra_keys)
+                try:
+                    return s.validate(data)
+                except SchemaError as _x:
+                    x = _x
+            if indexes and indexes[-1] == dispatch.last:
+                self._raise(data, x)
+            # The error comes from the last alternative; try them all for it
+
         x = SchemaError([], [])
         for s in [self._schema(s, error=self._error,
                                ignore_extra_keys=self._ignore_extra_keys)
@@ -116,15 +167,151 @@ class Or(And):
                 return s.validate(data)
             except SchemaError as _x:
                 x = _x
+        self._raise(data, x)
+
+    def _raise(self, data, x):
         raise SchemaError(['%r did not validate %r' % (self, data)] + x.autos,
                           [self._error.format(data) if self._error else None] +
                           x.errors)
 
 
+_MISSING = object()
+
+
+class _OrDispatch(object):
+    """
+    Finds the alternatives of an :class:`Or` that could accept a value, in
+    their original order.  Every other alternative is certain to fail:
+
+    * a type (or dict, list, ...) schema when the value isn't an instance;
+    * a literal that isn't equal to the value;
+    * a dict schema with a required ``key: literal`` item, when the value
+      is a dict whose ``key`` is missing or holds a different value.
+
+    Anything else (callables, validators, ...) is always a candidate.
+    Candidates are cached per type of value and discriminator value.
+    """
+    def __init__(self, alternatives, discriminator=None):
+        self.last = len(alternatives) - 1
+        kinds = [_alternative_kind(a) for a in alternatives]
+
+        if discriminator is None:
+            counts = {}
+            for kind in kinds:
+                if kind[0] == DICT:
+                    for key in kind[2]:
+                        counts[key] = counts.get(key, 0) + 1
+            if counts:
+                best = max(counts.values())
+                if best > 1:
+                    discriminator = [key for key, count in counts.items()
+                                     if count == best][0]
+        self.key = discriminator
+
+        self._types = []  # (index, type) for type-checked alternatives
+        self._wild = []  # indexes that are always candidates
+        self._keyed = {}  # discriminator value -> indexes of dict alternatives
+        self._literals = {}  # literal -> indexes
+        for index, kind in enumerate(kinds):
+            flavor = kind[0]
+            if flavor == COMPARABLE:
+                self._literals.setdefault(kind[1], []).append(index)
+            elif (flavor == DICT) and (discriminator in kind[2]):
+                self._keyed.setdefault(kind[2][discriminator], []).append(index)
+            elif flavor in (DICT, TYPE, ITERABLE):
+                self._types.append((index, kind[1]))
+            else:
+                self._wild.append(index)
+
+        self.useful = bool(self._types or self._keyed or self._literals)
+        self._all_literals = tuple(sorted(
+            i for indexes in self._literals.values() for i in indexes))
+        self._all_keyed = tuple(sorted(
+            i for indexes in self._keyed.values() for i in indexes))
+        self._cache = {}
+
+    def candidates(self, data):
+        """Return the indexes of the alternatives that could accept ``data``"""
+        value = _MISSING
+        if (self.key is not None) and isinstance(data, dict):
+            value = data.get(self.key, _MISSING)
+
+        try:
+            cache_key = (type(data), value if value in self._keyed else _MISSING)
+        except TypeError:  # unhashable
+            cache_key = None
+            found = self._select(data, value, True)
+        else:
+            found = self._cache.get(cache_key)
+            if found is None:
+                found = self._cache[cache_key] = self._select(data, value, False)
+
+        if self._literals:
+            try:
+                extra = self._literals.get(data)
+            except TypeError:  # unhashable
+                extra = self._all_literals
+            if extra:
+                found = tuple(sorted(found + tuple(extra)))
+        return found
+
+    def _select(self, data, value, unhashable):
+        found = list(self._wild)
+        found.extend(index for (index, cls) in self._types if isinstance(data, cls))
+        if isinstance(data, dict):
+            if unhashable:
+                found.extend(self._all_keyed)
+            elif value is not _MISSING:
+                found.extend(self._keyed.get(value, ()))
+        return tuple(sorted(found))
+
+
+def _alternative_kind(s):
+    """
+    Return ``(flavor, type or literal, {key: literal})`` describing which
+    data the schema ``s`` could accept, for :class:`_OrDispatch`.
+    """
+    while _uses_base_validate(s, Schema):
+        s = s._schema
+
+    flavor = _priority(s)
+    if flavor == TYPE:
+        return TYPE, s, {}
+    if flavor == ITERABLE:
+        return ITERABLE, type(s), {}
+    if flavor == DICT:
+        items = {}
+        for skey, svalue in s.items():
+            # Plain literal keys are matched before any other schema key
+            if type(skey) in (Optional, Forbidden) or _priority(skey) != COMPARABLE:
+                continue
+            while _uses_base_validate(svalue, Schema):
+                svalue = svalue._schema
+            if _priority(svalue) != COMPARABLE:
+                continue
+            try:
+                hash(skey)
+                hash(svalue)
+            except TypeError:
+                continue
+            items[skey] = svalue
+        return DICT, dict, items
+    if flavor == COMPARABLE:
+        try:
+            hash(s)
+        except TypeError:
+            return VALIDATOR, None, {}
+        return COMPARABLE, s, {}
+    return flavor, None, {}
+
+
 class Regex(object):
     """
     Enables schema.py to validate string using regular expressions.
     """
+    # Results may be memoized; see :class:`ValidationMemo`
+    pure = True
+
     # Map all flags bits to a more readable description
     NAMES = ['re.ASCII', 're.DEBUG', 're.VERBOSE', 're.UNICODE', 're.DOTALL',
              're.MULTILINE', 're.LOCALE', 're.IGNORECASE', 're.TEMPLATE']
@@ -168,11 +355,19 @@ class Use(object):
     """
     For more general use cases, you can use the Use class to transform
     the data while it is being validate.
+
+    Pass ``pure=True`` if the callable always returns the same result for
+    the same data, and has no side effects, so its results can be memoized
+    (see :class:`ValidationMemo`).  Builtin types such as ``int`` are
+    treated as pure.
     """
-    def __init__(self, callable_, error=None):
+    def __init__(self, callable_, error=None, pure=None):
         assert callable(callable_)
         self._callable = callable_
         self._error = error
+        if pure is None:
+            pure = callable_ in _PURE_CALLABLES
+        self.pure = pure
 
     def __repr__(self):
         return '%s(%r)' % (self.__class__.__name__, self._callable)
@@ -193,6 +388,10 @@ class Use(object):
 
 COMPARABLE, CALLABLE, VALIDATOR, TYPE, DICT, ITERABLE = range(6)
 
+# Callables that ``Use`` can always memoize
+_PURE_CALLABLES = frozenset([
+    int, float, str, bool, complex, bytes, tuple, frozenset, len, abs])
+
 
 def _priority(s):
     """Return priority for a given object."""
@@ -219,10 +418,42 @@ class Schema(object):
         self._schema = schema
         self._error = error
         self._ignore_extra_keys = ignore_extra_keys
+        self._compiled = None
+        self._compiled_stats = None
 
     def __repr__(self):
         return '%s(%r)' % (self.__class__.__name__, self._schema)
 
+    def validate_all(self, data):
+        """
+        Return every error in ``data``; see :meth:`CompiledSchema.validate_all`
+        """
+        return self.compile().validate_all(data)
+
+    def compile(self, stats=None, memo=None):
+        """
+        Return a :class:`CompiledSchema` for this schema.
+
+        The schema tree is walked once and turned into prebuilt validator
+        closures, so repeated validation skips the type dispatch, key sorting
+        and wrapper construction that :meth:`validate` does on every call.
+        The result is cached; the schema must not be mutated afterwards.
+
+        :param stats: A ``yamiconfig.stats.LoadStats``; if given, every node
+            records its call count and time
+        :param memo: A :class:`ValidationMemo`; if given, results for
+            identical subtrees of data are reused
+        """
+        if (stats is not None) or (memo is not None):
+            compiled = self._compiled_stats
+            if (compiled is None) or (compiled.stats is not stats) or (compiled.memo is not memo):
+                compiled = self._compiled_stats = CompiledSchema(self, stats, memo)
+            return compiled
+
+        if self._compiled is None:
+            self._compiled = CompiledSchema(self)
+        return self._compiled
+
     @staticmethod
     def _dict_key_priority(s):
         """Return priority for a given key object."""
@@ -376,3 +607,690 @@ def _callable_str(callable_):
     if hasattr(callable_, '__name__'):
         return callable_.__name__
     return str(callable_)
+
+
+def _uses_base_validate(s, cls):
+    """Return True if ``s`` is validated by ``cls.validate`` itself."""
+    return isinstance(s, cls) and type(s).validate == cls.validate
+
+
+def _literal_key(skey):
+    """Return ``(True, value)`` if ``skey`` only matches a single literal."""
+    if isinstance(skey, (Optional, Forbidden)):
+        if not _uses_base_validate(skey, Schema):
+            return False, None
+        skey = skey._schema
+    if _priority(skey) != COMPARABLE:
+        return False, None
+    try:
+        hash(skey)
+    except TypeError:
+        return False, None
+    return True, skey
+
+
+class _Compiler(object):
+    """Turns a schema tree into a tree of validator closures.
+
+    Each ``_compile_*`` method mirrors one branch of :meth:`Schema.validate`
+    and must raise the same errors with the same messages.
+    """
+    def __init__(self, stats=None, collect=None, memo=None):
+        self.stats = stats
+        self.collect = collect
+        self.memo = memo
+        self._pure = {}  # id(schema node) -> bool
+
+    def compile(self, s, e=None, i=False):
+        validate = self._compile(s, e, i)
+        if (self.memo is not None) and (self.collect is None) and self._memoizable(s):
+            validate = self._memoized(validate)
+        if self.stats is not None:
+            validate = self._timed(validate, s)
+        return validate
+
+    def _memoizable(self, s):
+        """Return True for the nodes worth memoizing, if they're pure."""
+        flavor = _priority(s)
+        if flavor in (DICT, ITERABLE):
+            return self.is_pure(s)
+        if flavor == VALIDATOR and not _uses_base_validate(s, Schema):
+            return self.is_pure(s)
+        return False
+
+    def is_pure(self, s):
+        """
+        Return True if validating with ``s`` only depends on the data, and
+        has no side effects.  Predicates (plain callables) are assumed pure;
+        validators must say so with a ``pure`` attribute.
+        """
+        pure = self._pure.get(id(s))
+        if pure is None:
+            flavor = _priority(s)
+            if flavor == ITERABLE:
+                pure = all(self.is_pure(a) for a in s)
+            elif flavor == DICT:
+                pure = all(self.is_pure(k) and self.is_pure(v) for (k, v) in s.items())
+            elif flavor != VALIDATOR:
+                pure = True
+            elif _uses_base_validate(s, Schema):
+                pure = self.is_pure(s._schema)
+            elif type(s) in (And, Or):
+                pure = (s._schema is Schema) and all(self.is_pure(a) for a in s._args)
+            else:
+                pure = getattr(s, 'pure', False) is True
+            self._pure[id(s)] = pure
+        return pure
+
+    def _memoized(self, validate):
+        lookup = self.memo._lookup
+        store = self.memo._store
+        token = self.memo._token
+        node = next(_node_ids)
+
+        def memoized(data):
+            t = token(data)
+            if t is None:
+                return validate(data)
+            key = (node, t)
+            found = lookup(key)
+            if found is not None:
+                if found[0]:
+                    return found[1]
+                raise copy.copy(found[1])
+            try:
+                result = validate(data)
+            except SchemaError as x:
+                store(key, (False, copy.copy(x)))
+                raise
+            store(key, (True, result))
+            return result
+
+        memoized.__dict__.update(validate.__dict__)
+        return memoized
+
+    def _timed(self, validate, s):
+        from .stats import clock, node_label
+
+        label = node_label(s)
+        record = self.stats.record_node
+
+        def timed(data):
+            start = clock()
+            try:
+                return validate(data)
+            finally:
+                record(validate, label, clock() - start)
+
+        timed.__dict__.update(validate.__dict__)
+        return timed
+
+    def _compile(self, s, e, i):
+        flavor = _priority(s)
+        if flavor == ITERABLE:
+            return self._compile_iterable(s, e, i)
+        if flavor == DICT:
+            return self._compile_dict(s, e, i)
+        if flavor == TYPE:
+            return self._compile_type(s, e)
+        if flavor == VALIDATOR:
+            return self._compile_validator(s, e)
+        if flavor == CALLABLE:
+            return self._compile_callable(s, e)
+        return self._compile_comparable(s, e)
+
+    def compile_schema(self, schema):
+        """Compile a :class:`Schema` instance."""
+        if not _uses_base_validate(schema, Schema):
+            return schema.validate
+        return self.compile(
+            schema._schema, schema._error, schema._ignore_extra_keys)
+
+    def _compile_comparable(self, s, e):
+        def validate(data):
+            if s == data:
+                return data
+            raise SchemaError('%r does not match %r' % (s, data),
+                              e.format(data) if e else None)
+        return validate
+
+    def _compile_type(self, s, e):
+        def validate(data):
+            if isinstance(data, s):
+                return data
+            raise SchemaUnexpectedTypeError(
+                '%r should be instance of %r' % (data, s.__name__),
+                e.format(data) if e else None)
+        return validate
+
+    def _compile_callable(self, s, e):
+        f = _callable_str(s)
+
+        def validate(data):
+            try:
+                if s(data):
+                    return data
+            except SchemaError as x:
+                raise SchemaError([None] + x.autos, [e] + x.errors)
+            except BaseException as x:
+                raise SchemaError('%s(%r) raised %r' % (f, data, x),
+                                  e.format(data) if e else None)
+            raise SchemaError('%s(%r) should evaluate to True' % (f, data), e)
+        return validate
+
+    def _compile_node(self, s):
+        """Compile the ``validate`` method of a validator object."""
+        if _uses_base_validate(s, Schema):
+            return self.compile_schema(s)
+        if type(s) in (And, Or) and s._schema is Schema:
+            # Alternatives must fail as a whole, so their errors aren't
+            # collected one by one
+            compiler = self if self.collect is None else _Compiler(self.stats)
+            args = [compiler.compile(a, s._error, s._ignore_extra_keys)
+                    for a in s._args]
+            if type(s) is Or:
+                return self._compile_or(s, args)
+            return self._compile_and(args)
+        return s.validate
+
+    def _compile_validator(self, s, e):
+        inner = self._compile_node(s)
+
+        def validate(data):
+            try:
+                return inner(data)
+            except SchemaError as x:
+                raise SchemaError([None] + x.autos, [e] + x.errors)
+            except BaseException as x:
+                raise SchemaError('%r.validate(%r) raised %r' % (s, data, x),
+                                  e.format(data) if e else None)
+
+        # Nested ``Schema`` objects don't hide a dict schema's items
+        if hasattr(inner, 'match'):
+            validate.match = inner.match
+            validate.ignore_extra_keys = inner.ignore_extra_keys
+            validate.lookup = inner.lookup
+        return validate
+
+    def _compile_and(self, args):
+        def validate(data):
+            for arg in args:
+                data = arg(data)
+            return data
+        return validate
+
+    def _compile_or(self, s, args):
+        e = s._error
+        dispatch = s._dispatcher()
+        if dispatch is not None:
+            return self._compile_dispatch(s, args, dispatch)
+
+        def validate(data):
+            x = SchemaError([], [])
+            for arg in args:
+                try:
+                    return arg(data)
+                except SchemaError as _x:
+                    x = _x
+            raise SchemaError(['%r did not validate %r' % (s, data)] + x.autos,
+                              [e.format(data) if e else None] + x.errors)
+        return validate
+
+    def _compile_dispatch(self, s, args, dispatch):
+        """An ``Or`` that only tries the alternatives that could match."""
+        e = s._error
+        candidates = dispatch.candidates
+        last = dispatch.last
+
+        def validate(data):
+            x = SchemaError([], [])
+            indexes = candidates(data)
+            for index in indexes:
+                try:
+                    return args[index](data)
+                except SchemaError as _x:
+                    x = _x
+            if not (indexes and indexes[-1] == last):
+                # The error comes from the last alternative; try them all
+                for arg in args:
+                    try:
+                        return arg(data)
+                    except SchemaError as _x:
+                        x = _x
+            raise SchemaError(['%r did not validate %r' % (s, data)] + x.autos,
+                              [e.format(data) if e else None] + x.errors)
+        return validate
+
+    def _compile_iterable(self, s, e, i):
+        check_type = self._compile_type(type(s), e)
+        o = Or(*s, error=e, schema=Schema, ignore_extra_keys=i)
+
+        if self.collect is None:
+            item = self._compile_or(o, [self.compile(a, e, i) for a in s])
+
+            def validate(data):
+                data = check_type(data)
+                return type(data)(item(d) for d in data)
+            return validate
+
+        ctx = self.collect
+        if len(s) == 1:
+            item = self.compile(s[0], e, i)
+        else:
+            plain = _Compiler(self.stats)
+            item = plain._compile_or(o, [plain.compile(a, e, i) for a in s])
+
+        def validate_collecting(data):
+            try:
+                data = check_type(data)
+            except SchemaError as x:
+                ctx.add(x)
+                return data
+
+            new = []
+            path = ctx.path
+            for index, d in enumerate(data):
+                path.append(index)
+                try:
+                    new.append(item(d))
+                except SchemaError as x:
+                    ctx.add(x)
+                finally:
+                    path.pop()
+            return type(data)(new)
+        return validate_collecting
+
+    def _compile_dict(self, s, e, i):
+        check_type = self._compile_type(dict, e)
+
+        # Entries are kept in the order ``Schema.validate`` tries them.  Keys
+        # that can only match one literal value are found with a dict lookup;
+        # every other key has to be tried against each data key.
+        literals = {}
+        others = []
+        for index, skey in enumerate(
+                sorted(s, key=Schema._dict_key_priority)):
+            forbidden = isinstance(skey, Forbidden)
+            is_literal, literal = _literal_key(skey)
+            entry = (
+                index, skey, forbidden,
+                None if is_literal else self.compile(skey, e),
+                self.compile(s[skey], e, False if forbidden else i),
+            )
+            if is_literal:
+                literals.setdefault(literal, []).append(entry)
+            else:
+                others.append(entry)
+
+        table = dict(
+            (literal, tuple(sorted(entries + others)))
+            for literal, entries in literals.items())
+        others = tuple(others)
+
+        required = frozenset(
+            k for k in s if type(k) not in [Optional, Forbidden])
+        defaults = [k for k in s
+                    if type(k) is Optional and hasattr(k, 'default')]
+        ignore_extra_keys = i
+
+        def match(key, value, data):
+            """Return ``(skey, new key, new value)``, or None if no key matches"""
+            for _, skey, forbidden, key_fn, value_fn in table.get(key, others):
+                if key_fn is None:
+                    nkey = key
+                else:
+                    try:
+                        nkey = key_fn(key)
+                    except SchemaError:
+                        continue
+                if forbidden:
+                    try:
+                        value_fn(value)
+                    except SchemaError:
+                        continue
+                    raise SchemaForbiddenKeyError(
+                        'Forbidden key encountered: %r in %r' % (nkey, data), e)
+                try:
+                    nvalue = value_fn(value)
+                except SchemaError as x:
+                    k = "Key '%s' error:" % nkey
+                    error = SchemaError([k] + x.autos, [e] + x.errors)
+                    error.schema_key = skey
+                    raise error
+                return skey, nkey, nvalue
+            return None
+
+        def lookup(key):
+            """Return the value validator of the schema key that ``key`` matches"""
+            for _, skey, forbidden, key_fn, value_fn in table.get(key, others):
+                if key_fn is not None:
+                    try:
+                        key_fn(key)
+                    except SchemaError:
+                        continue
+                return None if forbidden else value_fn
+            return None
+
+        if self.collect is not None:
+            validate = self._collecting_dict(
+                check_type, match, required, defaults, ignore_extra_keys, e)
+            validate.lookup = lookup
+            return validate
+
+        def validate(data):
+            data = check_type(data)
+            new = type(data)()
+            coverage = set()
+            for key, value in data.items():
+                matched = match(key, value, data)
+                if matched is not None:
+                    skey, nkey, new[nkey] = matched
+                    coverage.add(skey)
+            if not required.issubset(coverage):
+                missing_keys = required - coverage
+                s_missing_keys = \
+                    ', '.join(repr(k) for k in sorted(missing_keys, key=repr))
+                raise \
+                    SchemaMissingKeyError('Missing keys: ' + s_missing_keys, e)
+            if not ignore_extra_keys and (len(new) != len(data)):
+                wrong_keys = set(data.keys()) - set(new.keys())
+                s_wrong_keys = \
+                    ', '.join(repr(k) for k in sorted(wrong_keys, key=repr))
+                raise \
+                    SchemaWrongKeyError(
+                        'Wrong keys %s in %r' % (s_wrong_keys, data),
+                        e.format(data) if e else None)
+
+            for default in defaults:
+                if default not in coverage:
+                    new[default.key] = default.default
+
+            return new
+
+        validate.match = match
+        validate.ignore_extra_keys = ignore_extra_keys
+        validate.lookup = lookup
+        return validate
+
+    def _collecting_dict(self, check_type, match, required, defaults,
+                         ignore_extra_keys, e):
+        """
+        The dict validator for :meth:`CompiledSchema.validate_all`: errors are
+        recorded with their key path instead of raised, and validation
+        carries on with the next key.
+        """
+        ctx = self.collect
+
+        def validate(data):
+            try:
+                data = check_type(data)
+            except SchemaError as x:
+                ctx.add(x)
+                return data
+
+            new = type(data)()
+            coverage = set()
+            failed = set()
+            path = ctx.path
+            for key, value in data.items():
+                path.append(key)
+                try:
+                    matched = match(key, value, data)
+                except SchemaError as x:
+                    ctx.add(x)
+                    failed.add(key)
+                    coverage.add(getattr(x, 'schema_key', None))
+                    continue
+                finally:
+                    path.pop()
+                if matched is not None:
+                    skey, nkey, new[nkey] = matched
+                    coverage.add(skey)
+
+            if not required.issubset(coverage):
+                missing_keys = required - coverage
+                ctx.add(SchemaMissingKeyError('Missing keys: ' + ', '.join(
+                    repr(k) for k in sorted(missing_keys, key=repr)), e))
+            if not ignore_extra_keys:
+                wrong_keys = set(data.keys()) - set(new.keys()) - failed
+                if wrong_keys:
+                    ctx.add(SchemaWrongKeyError(
+                        'Wrong keys %s in %r' % (', '.join(
+                            repr(k) for k in sorted(wrong_keys, key=repr)), data),
+                        e.format(data) if e else None))
+
+            for default in defaults:
+                if default not in coverage:
+                    new[default.key] = default.default
+
+            return new
+
+        validate.match = match
+        validate.ignore_extra_keys = ignore_extra_keys
+        return validate
+
+
+class _Collector(threading.local):
+    """Where :meth:`CompiledSchema.validate_all` gathers its errors"""
+    def reset(self):
+        self.errors = []
+        self.path = []
+
+    def add(self, error):
+        error.path = tuple(self.path)
+        self.errors.append(error)
+
+
+_node_ids = itertools.count()
+
+
+class ValidationMemo(object):
+    """
+    A bounded (LRU) cache of validation results, for data that repeats the
+    same subtrees many times.  Pass it to :meth:`Schema.compile`.
+
+    Results are keyed by schema node and the structure of the data, types
+    included (so ``1``, ``1.0`` and ``True`` differ).  Each subtree's key is
+    worked out once per validation, from the bottom up.  Only nodes whose
+    whole schema is pure are memoized: see ``Use(pure=...)``.
+
+    Memoized results are shared by every identical subtree; treat them as
+    read-only.
+
+    :param int maxsize: The maximum number of results kept
+    """
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._tokens = {}  # structure -> token
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens.clear()
+
+    def _lookup(self, key):
+        with self._lock:
+            found = self._entries.pop(key, None)
+            if found is None:
+                self.misses += 1
+                return None
+            self._entries[key] = found
+            self.hits += 1
+            return found
+
+    def _store(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            if len(self._tokens) > 8 * self.maxsize:
+                # Tokens are never reused, so forgetting them is safe
+                self._tokens.clear()
+
+    def _token(self, data):
+        """Return the token for ``data``'s structure, or None if unhashable"""
+        known = getattr(self._local, 'known', None)
+        if known:
+            token = known.get(id(data))
+            if token is not None:
+                return token
+        return self._structure(data, None)
+
+    def _structure(self, data, known):
+        cls = type(data)
+        if isinstance(data, dict):
+            key = [cls]
+            for k, v in data.items():
+                tk = self._structure(k, known)
+                tv = self._structure(v, known)
+                if (tk is None) or (tv is None):
+                    return None
+                key.append(tk)
+                key.append(tv)
+            key = tuple(key)
+        elif isinstance(data, (list, tuple)):
+            key = [cls]
+            for v in data:
+                tv = self._structure(v, known)
+                if tv is None:
+                    return None
+                key.append(tv)
+            key = tuple(key)
+        else:
+            # -0.0 == 0.0, and NaN isn't equal to itself: key floats by repr
+            key = (cls, repr(data) if isinstance(data, (float, complex)) else data)
+            try:
+                hash(key)
+            except TypeError:
+                return None
+            known = None
+
+        token = self._tokens.get(key)
+        if token is None:
+            token = self._tokens.setdefault(key, next(self._counter))
+        if known is not None:
+            known[id(data)] = token
+        return token
+
+    def _begin(self, data):
+        """Work out the tokens of every subtree of ``data``, for one pass"""
+        previous = getattr(self._local, 'known', None)
+        known = {}
+        self._structure(data, known)
+        self._local.known = known
+        return previous
+
+    def _end(self, previous):
+        self._local.known = previous
+
+
+class CompiledSchema(object):
+    """
+    A :class:`Schema` prepared for fast, repeated validation.
+
+    Use :meth:`Schema.compile` to build one.  :meth:`validate` accepts and
+    rejects exactly the same data as :meth:`Schema.validate`.
+    """
+    def __init__(self, schema, stats=None, memo=None):
+        self.schema = schema
+        self.stats = stats
+        self.memo = memo
+        self._validate = _Compiler(stats, memo=memo).compile_schema(schema)
+        self._collector = None
+        self._validate_all = None
+        # Parent keys -> dict validator; see ``item_schema``
+        self._items = {(): self._validate if hasattr(self._validate, 'match') else None}
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.schema)
+
+    def validate(self, data):
+        if self.memo is None:
+            return self._validate(data)
+
+        previous = self.memo._begin(data)
+        try:
+            return self._validate(data)
+        finally:
+            self.memo._end(previous)
+
+    def validate_all(self, data):
+        """
+        Validate ``data`` in a single pass, and return every error found
+        instead of stopping at the first one.
+
+        Each error has a ``path`` attribute: the tuple of keys (and list
+        indexes) leading to the value that failed.  Alternatives of
+        :class:`Or` and :class:`And` are reported as a single error.
+
+        :return: a list of :class:`SchemaError`; empty if ``data`` is valid
+        """
+        if self._validate_all is None:
+            self._collector = _Collector()
+            self._validate_all = _Compiler(
+                self.stats, self._collector).compile_schema(self.schema)
+
+        collector = self._collector
+        collector.reset()
+        try:
+            self._validate_all(data)
+        except SchemaError as x:
+            collector.add(x)
+        return collector.errors
+
+    def item_schema(self, parent=()):
+        """
+        Return the compiled dict validator found by following the keys of
+        ``parent`` down from the top of the schema, or None if one of them
+        leads to something other than a plain dict schema (such as an
+        :class:`Or`).  Results are cached.
+        """
+        try:
+            return self._items[parent]
+        except KeyError:
+            pass
+
+        node = self.item_schema(parent[:-1])
+        if node is not None:
+            node = node.lookup(parent[-1])
+            if not hasattr(node, 'match'):
+                node = None
+        self._items[parent] = node
+        return node
+
+    def validate_item(self, key, value, parent=()):
+        """
+        Validate a single ``key: value`` item of a dict schema, as if it were
+        part of a larger dict.  Missing keys are not checked.
+
+        :param tuple parent: The keys of the dict the item belongs to; see
+            :meth:`item_schema`
+        :return: the validated ``(key, value)``
+        """
+        node = self.item_schema(tuple(parent))
+        if node is None:
+            raise TypeError('%r has no dict schema at %r' % (self.schema, parent))
+
+        data = {key: value}
+        if self.memo is None:
+            matched = node.match(key, value, data)
+        else:
+            previous = self.memo._begin(value)
+            try:
+                matched = node.match(key, value, data)
+            finally:
+                self.memo._end(previous)
+        if matched is None:
+            if node.ignore_extra_keys:
+                return key, value
+            raise SchemaWrongKeyError('Wrong keys %r in %r' % (key, data))
+        return matched[1], matched[2]
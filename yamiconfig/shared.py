@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+# coding: utf-8
+'''
+Share one read-only copy of the settings between processes.
+
+A master process writes the merged settings to a memory-mapped file with
+``publish`` (or ``Configuration.share``); workers open it with
+``SharedConfig``.  Every worker maps the same pages, and lookups read them
+in place, so the settings don't take memory in each worker.
+
+Layout (little-endian)::
+
+    header   magic, version (u64), count (u64), index offset (u64)
+    index    count entries of: key offset (u64), key length (u32),
+             value offset (u64), value length (u32); sorted by key
+    keys     the UTF-8 path of every leaf setting, keys joined by NUL
+    values   the marshalled value of every leaf setting
+
+Publishing replaces the file atomically with a higher version; workers call
+``SharedConfig.refresh()`` to map the new one.  The file is readable by
+every user by default (``0644``), as workers often run as a different user
+than the master; pass a stricter ``mode`` to ``publish`` for settings that
+hold secrets.
+'''
+
+# Imports #####################################################################
+import os
+import mmap
+import struct
+import marshal
+
+from .artifact import _atomic_open, _plain
+from .env import leaf_paths
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # Python 2
+    from collections import Mapping
+
+
+# Metadata ####################################################################
+__author__ = 'Timothy McFadden'
+__creationDate__ = '17-OCT-2026'
+__license__ = 'MIT'
+
+
+MAGIC = b'YAMISHM1'
+_HEADER = struct.Struct('<8sQQQ')
+_ENTRY = struct.Struct('<QIQI')
+_SEP = b'\x00'
+_MISSING = object()
+
+
+def _encode_path(path):
+    return _SEP.join(
+        (k if isinstance(k, str) else str(k)).encode('utf-8') for k in path)
+
+
+def read_version(path):
+    '''Return the version of a published file, or 0 if there isn't one'''
+    try:
+        with open(path, 'rb') as fh:
+            header = fh.read(_HEADER.size)
+    except (IOError, OSError):
+        return 0
+    if len(header) < _HEADER.size or header[:len(MAGIC)] != MAGIC:
+        return 0
+    return _HEADER.unpack(header)[1]
+
+
+def publish(data, path, version=None, mode=0o644):
+    '''
+    Write ``data`` (any mapping) to ``path`` for ``SharedConfig`` readers.
+
+    :param int version: Defaults to one more than the current file's
+    :param int mode: The permissions of the file; by default, anyone may
+        read it
+    :returns int: The version written
+    '''
+    if version is None:
+        version = read_version(path) + 1
+
+    items = sorted(
+        (_encode_path(key), marshal.dumps(_plain(value)))
+        for (key, value) in leaf_paths(data))
+
+    count = len(items)
+    index_offset = _HEADER.size
+    keys_offset = index_offset + count * _ENTRY.size
+    values_offset = keys_offset + sum(len(key) for (key, _) in items)
+
+    index = []
+    key_at, value_at = keys_offset, values_offset
+    for key, value in items:
+        index.append(_ENTRY.pack(key_at, len(key), value_at, len(value)))
+        key_at += len(key)
+        value_at += len(value)
+
+    with _atomic_open(path, mode) as fh:
+        fh.write(_HEADER.pack(MAGIC, version, count, index_offset))
+        fh.write(b''.join(index))
+        fh.write(b''.join(key for (key, _) in items))
+        fh.write(b''.join(value for (_, value) in items))
+    return version
+
+
+class _Store(object):
+    '''One mapped version of a published file'''
+    def __init__(self, path):
+        with open(path, 'rb') as fh:
+            st = os.fstat(fh.fileno())
+            self.map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        self.stat = (st.st_dev, st.st_ino, st.st_size, st.st_mtime)
+
+        (magic, self.version, self.count, self.index) = _HEADER.unpack_from(
+            self.map, 0)
+        if magic != MAGIC:
+            raise ValueError('%s is not a shared yamiconfig file' % path)
+
+    def key(self, position):
+        key_at, key_len, _, _ = _ENTRY.unpack_from(
+            self.map, self.index + position * _ENTRY.size)
+        return self.map[key_at:key_at + key_len]
+
+    def value(self, position):
+        _, _, value_at, value_len = _ENTRY.unpack_from(
+            self.map, self.index + position * _ENTRY.size)
+        return marshal.loads(self.map[value_at:value_at + value_len])
+
+    def bisect(self, key, lo=0, hi=None):
+        '''Return the first position whose key is not less than ``key``'''
+        hi = self.count if hi is None else hi
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, key):
+        '''
+        Return ``(True, value)`` for a leaf, ``(False, (lo, hi))`` for the
+        range of a section's leaves, or None.
+        '''
+        position = self.bisect(key)
+        if position < self.count and self.key(position) == key:
+            return True, self.value(position)
+
+        if not key:
+            return False, (0, self.count)
+        prefix = key + _SEP
+        if position < self.count and self.key(position).startswith(prefix):
+            # Every key below the prefix sorts before prefix + b'\xff'
+            return False, (position, self.bisect(prefix + b'\xff', position))
+        return None
+
+    def children(self, prefix, lo, hi):
+        '''Return the names directly below ``prefix``, in order'''
+        names = []
+        skip = len(prefix) + 1 if prefix else 0
+        position = lo
+        while position < hi:
+            key = self.key(position)
+            name = key[skip:].split(_SEP, 1)[0]
+            names.append(name.decode('utf-8'))
+            # Jump past every other key in this child
+            child = key[:skip + len(name)] + _SEP + b'\xff'
+            position = self.bisect(child, position + 1, hi)
+        return names
+
+
+class SharedSection(Mapping):
+    '''A read-only view of a section of a ``SharedConfig``'''
+    def __init__(self, store, prefix, bounds):
+        self._store = store
+        self._prefix = prefix
+        self._bounds = bounds
+        self._keys = None
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, dict(self.items()))
+
+    def _path(self, key):
+        name = (key if isinstance(key, str) else str(key)).encode('utf-8')
+        return (self._prefix + _SEP + name) if self._prefix else name
+
+    def __getitem__(self, key):
+        path = self._path(key)
+        found = self._store.find(path)
+        if found is None:
+            raise KeyError(key)
+        if found[0]:
+            return found[1]
+        return SharedSection(self._store, path, found[1])
+
+    def __contains__(self, key):
+        return self._store.find(self._path(key)) is not None
+
+    def __iter__(self):
+        if self._keys is None:
+            self._keys = self._store.children(self._prefix, *self._bounds)
+        return iter(self._keys)
+
+    def __len__(self):
+        if self._keys is None:
+            self._keys = self._store.children(self._prefix, *self._bounds)
+        return len(self._keys)
+
+
+class SharedConfig(SharedSection):
+    '''
+    The settings published to ``path``, mapped read-only.
+
+    Reads see the version that was mapped when they started; call
+    ``refresh()`` (e.g. between requests) to pick up a newer version.
+    '''
+    def __init__(self, path):
+        self.path = path
+        store = _Store(path)
+        super(SharedConfig, self).__init__(store, b'', (0, store.count))
+
+    @property
+    def version(self):
+        return self._store.version
+
+    def refresh(self):
+        '''
+        Map the published file again if it has been replaced by a newer
+        version.  Costs one ``stat`` when nothing changed.
+
+        :returns bool: True if a new version was mapped
+        '''
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False
+        if (st.st_dev, st.st_ino, st.st_size, st.st_mtime) == self._store.stat:
+            return False
+
+        store = _Store(self.path)
+        if store.version <= self._store.version:
+            return False
+
+        # Views handed out earlier keep the old mapping alive
+        self._store, self._bounds, self._keys = store, (0, store.count), None
+        return True
+
+    def get_path(self, path, default=_MISSING):
+        '''Return a setting by its dotted path, e.g. ``'db.pool.size'``'''
+        key = _encode_path(path.split('.'))
+        found = self._store.find(key)
+        if found is None:
+            if default is _MISSING:
+                raise KeyError(path)
+            return default
+        if found[0]:
+            return found[1]
+        return SharedSection(self._store, key, found[1])
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# coding: utf-8
+'''
+Load-time instrumentation for ``Configuration`` and ``Schema``.
+
+Pass a ``LoadStats`` (or any object with the same ``record_*`` methods) as
+``Configuration(stats=...)`` or ``Schema.compile(stats=...)``.  Nothing is
+measured when no stats object is given.
+'''
+
+# Imports #####################################################################
+import time
+import threading
+from collections import defaultdict
+
+
+# Metadata ####################################################################
+__author__ = 'Timothy McFadden'
+__creationDate__ = '17-OCT-2026'
+__license__ = 'MIT'
+
+
+clock = getattr(time, 'perf_counter', time.time)
+
+
+def node_label(node, width=60):
+    '''Return a short, readable name for a schema node'''
+    if isinstance(node, dict):
+        return 'dict(%d keys)' % len(node)
+    if isinstance(node, type):
+        return node.__name__
+    text = repr(node)
+    return text if len(text) <= width else (text[:width - 3] + '...')
+
+
+class LoadStats(object):
+    '''
+    Collects timings and counters from ``Configuration`` and ``Schema``.
+
+    Override the ``record_*`` methods to forward measurements elsewhere,
+    such as to a metrics backend.
+
+    :param bool count_reads: Count reads of each top-level key
+    '''
+    def __init__(self, count_reads=True):
+        self.count_reads = count_reads
+        self.files = defaultdict(lambda: defaultdict(float))
+        self.nodes = {}  # node -> [label, calls, seconds]
+        self.reads = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record_file(self, path, phase, seconds, nbytes=None, keys=None):
+        '''
+        Record one phase of loading a file.
+
+        :param str path: The file (or ``<default>`` for default text)
+        :param str phase: ``read``, ``parse``, ``validate`` or ``cache``
+        '''
+        with self._lock:
+            record = self.files[path]
+            record[phase] += seconds
+            if nbytes is not None:
+                record['bytes'] = nbytes
+            if keys is not None:
+                record['keys'] = keys
+
+    def record_node(self, node, label, seconds):
+        '''
+        Record one call of a schema node; times include child nodes.
+
+        :param node: Identifies the node; nodes that share a label (such as
+            two ``int`` leaves) are kept apart
+        :param str label: The name to show for the node
+        '''
+        with self._lock:
+            record = self.nodes.get(node)
+            if record is None:
+                record = self.nodes[node] = [label, 0, 0.0]
+            record[1] += 1
+            record[2] += seconds
+
+    def hot_nodes(self, count=20):
+        '''Return the ``count`` slowest nodes, as ``(label, calls, seconds)``'''
+        with self._lock:
+            records = [tuple(record) for record in self.nodes.values()]
+        return sorted(records, key=lambda record: -record[2])[:count]
+
+    def record_read(self, key):
+        '''Record a read of a top-level key'''
+        if self.count_reads:
+            self.reads[key] += 1
+
+    def hot_keys(self, count=10):
+        '''Return the ``count`` most read keys, as ``(key, reads)`` pairs'''
+        return sorted(self.reads.items(), key=lambda item: -item[1])[:count]
+
+    def as_dict(self):
+        '''Return everything recorded, as plain data'''
+        return {
+            'files': dict((path, dict(record)) for (path, record) in self.files.items()),
+            'nodes': [
+                {'label': label, 'calls': calls, 'seconds': seconds}
+                for (label, calls, seconds) in self.hot_nodes(len(self.nodes))],
+            'reads': dict(self.reads),
+        }
+
+    def log(self, logger=None, level=None):
+        '''Write a summary to ``logger`` (at ``logging.INFO`` by default)'''
+        import logging
+        logger = logger or logging.getLogger('yamiconfig')
+        level = logging.INFO if level is None else level
+        for path, record in sorted(self.files.items()):
+            logger.log(level, 'file %s: %s', path, ', '.join(
+                ('%s=%.6fs' % item) if isinstance(item[1], float) else ('%s=%s' % item)
+                for item in sorted(record.items())))
+        for label, calls, seconds in self.hot_nodes():
+            logger.log(level, 'schema %s: %d calls, %.6fs', label, calls, seconds)
+        for key, reads in self.hot_keys():
+            logger.log(level, 'key %r: %d reads', key, reads)
@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+# coding: utf-8
+'''
+Reload a ``Configuration`` when its files change.
+
+On Linux, changes are picked up with inotify; everywhere else (or when
+inotify is not available) the files are polled with ``os.stat``.
+'''
+
+# Imports #####################################################################
+from __future__ import print_function
+import os
+import sys
+import errno
+import struct
+import select
+import threading
+
+from .cache import file_stat
+
+
+# Metadata ####################################################################
+__author__ = 'Timothy McFadden'
+__creationDate__ = '17-OCT-2026'
+__license__ = 'MIT'
+
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# Files are only looked at once they're closed (or moved into place), so a
+# half-written file is never loaded.
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+_EVENT = struct.Struct('iIII')
+
+
+def _stat(path):
+    try:
+        return file_stat(path)
+    except OSError:
+        return None
+
+
+class _Inotify(object):
+    '''A minimal ctypes wrapper around the Linux inotify API'''
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self._dirs = {}  # watch descriptor -> directory
+
+    def add_directory(self, path):
+        wd = self._add_watch(self.fd, path.encode(sys.getfilesystemencoding()), _WATCH_MASK)
+        if wd < 0:
+            raise OSError(errno.EINVAL, 'inotify_add_watch failed', path)
+        self._dirs[wd] = path
+
+    def read(self, timeout):
+        '''Return the paths with events, waiting up to ``timeout`` seconds'''
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
+
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return []
+            raise
+
+        paths = []
+        offset = 0
+        while offset < len(buf):
+            wd, _, _, length = _EVENT.unpack_from(buf, offset)
+            offset += _EVENT.size
+            name = buf[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if wd in self._dirs and name:
+                paths.append(os.path.join(
+                    self._dirs[wd], name.decode(sys.getfilesystemencoding())))
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class ConfigWatcher(object):
+    '''
+    Watches a ``Configuration``'s files and reloads the ones that change.
+
+    Only the changed file is parsed again; see
+    ``Configuration.reload_file``.
+
+    :param config: The ``Configuration`` to reload
+    :param float interval: Seconds between polls (or between checks for
+        ``stop()`` when using inotify)
+    :param bool use_inotify: Use inotify when it's available
+    :param on_reload: Called with the path of every reloaded file
+    '''
+    def __init__(self, config, interval=1.0, use_inotify=True, on_reload=None):
+        self.config = config
+        self.interval = interval
+        self.on_reload = on_reload
+        self._use_inotify = use_inotify and sys.platform.startswith('linux')
+        self._thread = None
+        self._inotify = None
+        self._stopped = threading.Event()
+        self._stats = {}
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @property
+    def paths(self):
+        '''The files being watched'''
+        return [path for path in self.config._layer_paths if path]
+
+    def start(self):
+        '''Start watching in a background thread'''
+        self._stats = dict((path, _stat(path)) for path in self.paths)
+        self._stopped.clear()
+
+        inotify = None
+        if self._use_inotify:
+            try:
+                inotify = _Inotify()
+                for directory in set(os.path.dirname(os.path.abspath(p)) for p in self.paths):
+                    inotify.add_directory(directory)
+            except (OSError, AttributeError):
+                if inotify:
+                    inotify.close()
+                inotify = None
+
+        self._inotify = inotify
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        '''Stop watching, and wait for the background thread to exit'''
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def uses_inotify(self):
+        '''True while watching with inotify rather than polling'''
+        return self._inotify is not None
+
+    def check(self, paths=None):
+        '''
+        Reload every watched file whose stat has changed.
+
+        :param list paths: Only check these paths
+        :returns list: The reloaded paths
+        '''
+        reloaded = []
+        for path in (self.paths if paths is None else paths):
+            stat = _stat(path)
+            if stat == self._stats.get(path):
+                continue
+            self._stats[path] = stat
+
+            try:
+                if not self.config.reload_file(path):
+                    continue
+            except Exception as e:
+                # Keep serving the current settings until the file is fixed
+                print("ERROR: Could not reload configuration file [%s]: %s" % (path, e))
+                continue
+
+            reloaded.append(path)
+            if self.on_reload:
+                self.on_reload(path)
+
+        return reloaded
+
+    def _run(self):
+        inotify = self._inotify
+        try:
+            while not self._stopped.is_set():
+                if inotify:
+                    watched = dict(
+                        (os.path.abspath(p), p) for p in self.paths)
+                    changed = [
+                        watched[p] for p in inotify.read(self.interval) if p in watched]
+                    if changed:
+                        self.check(sorted(set(changed)))
+                else:
+                    self._stopped.wait(self.interval)
+                    self.check()
+        finally:
+            if inotify:
+                inotify.close()
+                self._inotify = None